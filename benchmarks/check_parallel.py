@@ -0,0 +1,103 @@
+"""Check the pages recorded by the Sphinx extension when Sphinx reads and writes a large project in parallel.
+
+Usage::
+
+    python benchmarks/check_parallel.py [--pages N] [--jobs N]
+
+A synthetic project is built with ``sphinx-build -j``, then built again after some pages were removed and some were
+changed. After each build, the pages listed in ``pdf_metadata.json`` must be exactly the pages of the project, with the
+metadata of their source file, and the pages Sphinx wrote must be listed as updated.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Set
+
+from projects import SCENARIOS, write_project
+from sphinx.cmd.build import build_main
+
+
+def _build(srcdir: Path, outdir: Path, jobs: int) -> Dict:
+    status = build_main(["-q", "-j", str(jobs), "-b", "html", str(srcdir), str(outdir)])
+    if status != 0:
+        raise RuntimeError(f"Sphinx could not build the project in {srcdir}")
+    with open(outdir.joinpath("pdf_metadata.json"), encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def _check(pdf_metadata: Dict, pages: Set[str], updated: Set[str], revisions: Dict[str, str]) -> List[str]:
+    errors = []
+    local_options = pdf_metadata["LOCAL_OPTIONS"]
+    if set(local_options) != pages:
+        errors.append(
+            f"{len(set(local_options) - pages)} unexpected page(s), {len(pages - set(local_options))} missing page(s), "
+            f"e.g. {sorted(set(local_options) ^ pages)[:5]}"
+        )
+    wrong_metadata = sorted(
+        pagename
+        for pagename, revision in revisions.items()
+        if (local_options.get(pagename) or {}).get("pdf-revision") != revision
+    )
+    if wrong_metadata:
+        errors.append(f"{len(wrong_metadata)} page(s) with outdated metadata, e.g. {wrong_metadata[:5]}")
+    missing_updates = sorted(updated - set(pdf_metadata["UPDATED_PAGES"]))
+    if missing_updates:
+        errors.append(f"{len(missing_updates)} rewritten page(s) not listed as updated, e.g. {missing_updates[:5]}")
+    return errors
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Check the pages recorded by the Sphinx extension under sphinx-build -j.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--pages", type=int, default=1000, help="number of pages of the synthetic project")
+    parser.add_argument("--jobs", type=int, default=8, help="number of processes used by Sphinx")
+    return parser
+
+
+def main() -> int:
+    args = get_parser().parse_args()
+    scenario = SCENARIOS["pages-1000"]
+    scenario.pages = args.pages
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="pdfgen-parallel-") as tmpdir:
+        srcdir = Path(tmpdir).joinpath("source")
+        outdir = Path(tmpdir).joinpath("html")
+        write_project(scenario, srcdir, "alabaster")
+        pagenames = sorted(path.stem for path in srcdir.glob("*.rst"))
+        revisions = {pagename: "1.0" for pagename in pagenames if pagename != "index"}
+
+        print(f"Building {len(pagenames)} pages with -j {args.jobs}", file=sys.stderr)
+        errors = _check(_build(srcdir, outdir, args.jobs), set(pagenames), set(pagenames), revisions)
+        for error in errors:
+            print(f"Full build: {error}", file=sys.stderr)
+        failed = failed or bool(errors)
+
+        # Remove every tenth page and change the metadata of every seventh page
+        removed = set(pagenames[1::10]) - {"index"}
+        for pagename in removed:
+            srcdir.joinpath(f"{pagename}.rst").unlink()
+            del revisions[pagename]
+        changed = set(pagenames[::7]) - removed - {"index"}
+        for pagename in changed:
+            path = srcdir.joinpath(f"{pagename}.rst")
+            path.write_text(path.read_text(encoding="utf-8").replace(":pdf-revision: 1.0", ":pdf-revision: 2.0"))
+            revisions[pagename] = "2.0"
+
+        print(f"Rebuilding after removing {len(removed)} and changing {len(changed)} pages", file=sys.stderr)
+        pages = set(pagenames) - removed
+        errors = _check(_build(srcdir, outdir, args.jobs), pages, changed, revisions)
+        for error in errors:
+            print(f"Incremental build: {error}", file=sys.stderr)
+        failed = failed or bool(errors)
+
+    print("FAILED" if failed else "OK", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
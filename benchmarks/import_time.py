@@ -0,0 +1,106 @@
+"""Time the imports of the Sphinx extension and the CLI tool, and check that they do not import the PDF libraries.
+
+Usage::
+
+    python benchmarks/import_time.py [--runs N] [--budget MS]
+
+Loading the extension in a plain HTML build, or running ``sphinx-pdf-generate --version``, must not import WeasyPrint,
+BeautifulSoup, pypdf or the HTML parsers. These are imported once pages are converted to PDF. The script exits with an
+error if one of them is imported, or if the median import time of the package is over the budget.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Packages only needed to convert pages to PDF
+PDF_PACKAGES = ("weasyprint", "bs4", "pypdf", "pydyf", "tinycss2", "cssselect2", "fontTools", "lxml", "html5lib")
+
+TIMED_MARKER = "-- timed imports --"
+
+# Statement run first, statement whose imports are timed, and the packages the timed statement must not import
+SCENARIOS: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    # Sphinx loads the extension and its builder in a plain HTML build
+    "extension": (
+        "import sphinx.application, sphinx.builders.html",
+        "import sphinx_pdf_generate.pdf_generate, sphinx_pdf_generate.pdf_builder",
+        PDF_PACKAGES,
+    ),
+    # ``sphinx-pdf-generate --version``
+    "cli": (
+        "import sys; sys.argv = ['sphinx-pdf-generate', '--version']",
+        "import runpy; runpy.run_module('sphinx_pdf_generate', run_name='__main__')",
+        PDF_PACKAGES + ("sphinx", "docutils"),
+    ),
+}
+
+
+def _import_times(setup: str, statement: str) -> Tuple[float, List[str]]:
+    """Cumulative import time of the ``sphinx_pdf_generate`` package in milliseconds, and the modules imported."""
+    # The imports of the setup statement are left out, they are printed before the marker
+    code = (
+        f"{setup}\nimport sys\nsys.stderr.write({TIMED_MARKER!r} + '\\n')\nsys.stderr.flush()\n"
+        f"try:\n    {statement}\nexcept SystemExit:\n    pass\n"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=False
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Could not run {statement!r}:\n{process.stderr}")
+
+    total = 0.0
+    modules = []
+    lines = process.stderr.splitlines()
+    start = lines.index(TIMED_MARKER) + 1
+    for line in lines[start:]:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        module = name.strip()
+        modules.append(module)
+        # Only count the top level imports of the package, their cumulative time includes the nested ones
+        if name.startswith(" sphinx_pdf_generate") and not name.startswith("  "):
+            total += int(cumulative) / 1000
+    return total, modules
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Time the imports of the Sphinx extension and the CLI tool.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--runs", type=int, default=5, help="number of runs of each scenario")
+    parser.add_argument("--budget", type=float, help="maximum median import time of the package in milliseconds")
+    return parser
+
+
+def main() -> int:
+    args = get_parser().parse_args()
+    failed = False
+    for name, (setup, statement, forbidden) in SCENARIOS.items():
+        times = []
+        modules: List[str] = []
+        for _ in range(args.runs):
+            total, modules = _import_times(setup, statement)
+            times.append(total)
+        median = statistics.median(times)
+        print(f"{name}: {median:.1f} ms (median of {args.runs} runs)")
+
+        imported = sorted({module.split(".")[0] for module in modules} & set(forbidden))
+        if imported:
+            print(f"  imports {', '.join(imported)}", file=sys.stderr)
+            failed = True
+        if args.budget is not None and median > args.budget:
+            print(f"  over the budget of {args.budget:.1f} ms", file=sys.stderr)
+            failed = True
+
+    print("FAILED" if failed else "OK", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Synthetic Sphinx projects used by the benchmarks."""
+
+import struct
+import zlib
+from dataclasses import dataclass
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Callable, Dict, List
+
+LOREM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore "
+    "magna aliqua. Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo "
+    "consequat."
+)
+HEADING_CHARS = "=-~^\"'"
+IMAGE_FILES = 10
+
+
+def _heading(title: str, level: int) -> str:
+    return f"{title}\n{HEADING_CHARS[level] * len(title)}\n\n"
+
+
+def _regular_page(title: str) -> str:
+    text = _heading(title, 0)
+    for section in range(1, 6):
+        text += _heading(f"Section {section}", 1)
+        text += f"{LOREM}\n\n* First item\n* Second item\n* Third item\n\n"
+        text += ".. code-block:: python\n\n    def section():\n        return {}\n\n".format(section)
+        for subsection in range(1, 3):
+            text += _heading(f"Subsection {section}.{subsection}", 2)
+            text += f"{LOREM}\n\n"
+    return text
+
+
+def _deep_headings_page(title: str) -> str:
+    text = _heading(title, 0)
+
+    def sections(prefix: str, level: int) -> str:
+        if level >= len(HEADING_CHARS):
+            return ""
+        nested = ""
+        for index in range(1, 3):
+            number = f"{prefix}.{index}" if prefix else str(index)
+            nested += _heading(f"Heading {number}", level)
+            nested += f"{LOREM}\n\n"
+            nested += sections(number, level + 1)
+        return nested
+
+    return text + sections("", 1)
+
+
+def _large_table_page(title: str) -> str:
+    text = _heading(title, 0)
+    text += ".. list-table:: Large table\n   :header-rows: 1\n\n"
+    text += "".join(f"   {'*' if column == 0 else ' '} - Column {column}\n" for column in range(6))
+    for row in range(200):
+        for column in range(6):
+            text += f"   {'*' if column == 0 else ' '} - Cell {row}.{column} {LOREM[:40]}\n"
+    return text + "\n"
+
+
+def _tabs_page(title: str) -> str:
+    text = _heading(title, 0)
+    for tab_set in range(20):
+        text += _heading(f"Tabs {tab_set}", 1)
+        if find_spec("sphinx_design") is not None:
+            text += ".. tab-set::\n\n"
+            for tab in range(4):
+                text += f"    .. tab-item:: Tab {tab}\n\n        {LOREM}\n\n"
+        else:
+            # Markup written by sphinx-design, for environments without it
+            text += '.. raw:: html\n\n    <div class="sd-tab-set docutils">\n'
+            for tab in range(4):
+                item = tab_set * 4 + tab
+                checked = ' checked="checked"' if tab == 0 else ""
+                text += (
+                    f'    <input{checked} id="sd-tab-item-{item}" name="sd-tab-set-{tab_set}" type="radio">\n'
+                    f'    <label class="sd-tab-label" for="sd-tab-item-{item}">Tab {tab}</label>\n'
+                    f'    <div class="sd-tab-content docutils"><p>{LOREM}</p></div>\n'
+                )
+            text += "    </div>\n\n"
+    return text
+
+
+def _images_page(title: str) -> str:
+    text = _heading(title, 0)
+    for image in range(30):
+        text += f".. image:: /_static/images/image-{image % IMAGE_FILES}.png\n   :width: 200px\n\n{LOREM}\n\n"
+    return text
+
+
+def _png(width: int, height: int, seed: int) -> bytes:
+    """A PNG image with a gradient, without depending on an imaging library."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    rows = b"".join(
+        b"\0" + bytes(value for x in range(width) for value in ((x + seed * 25) % 256, y % 256, seed * 20 % 256))
+        for y in range(height)
+    )
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+@dataclass
+class Scenario:
+    """A synthetic project: ``pages`` pages written by ``page``."""
+
+    name: str
+    pages: int
+    page: Callable[[str], str]
+    description: str
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("pages-10", 10, _regular_page, "10 pages with sections, lists and code blocks"),
+        Scenario("pages-100", 100, _regular_page, "100 pages with sections, lists and code blocks"),
+        Scenario("pages-1000", 1000, _regular_page, "1,000 pages with sections, lists and code blocks"),
+        Scenario("deep-headings", 10, _deep_headings_page, "10 pages with 126 headings nested 6 levels deep"),
+        Scenario("large-tables", 10, _large_table_page, "10 pages with a table of 200 rows and 6 columns"),
+        Scenario("tabs", 10, _tabs_page, "10 pages with 20 sphinx-design tab sets of 4 tabs"),
+        Scenario("images", 10, _images_page, "10 pages with 30 images"),
+    ]
+}
+
+# Scenarios run when none are given on the command line
+DEFAULT_SCENARIOS: List[str] = [name for name in SCENARIOS if name != "pages-1000"]
+
+
+def write_project(scenario: Scenario, srcdir: Path, html_theme: str) -> None:
+    """Write the source files of a synthetic Sphinx project for ``scenario`` into ``srcdir``."""
+    extensions = ["sphinx_pdf_generate"]
+    if scenario.page is _tabs_page and find_spec("sphinx_design") is not None:
+        extensions.append("sphinx_design")
+
+    srcdir.mkdir(parents=True, exist_ok=True)
+    srcdir.joinpath("conf.py").write_text(
+        f'project = "Benchmark {scenario.name}"\n'
+        f"extensions = {extensions!r}\n"
+        f'html_theme = "{html_theme}"\n'
+        'pdfgen_author = "Sphinx-PDF Generate"\n'
+        'pdfgen_copyright = "Sphinx-PDF Generate"\n',
+        encoding="utf-8",
+    )
+
+    images_dir = srcdir.joinpath("_static", "images")
+    images_dir.mkdir(parents=True, exist_ok=True)
+    if scenario.page is _images_page:
+        for image in range(IMAGE_FILES):
+            images_dir.joinpath(f"image-{image}.png").write_bytes(_png(320, 200, image))
+
+    pagenames = [f"page-{page:04d}" for page in range(scenario.pages)]
+    index = _heading(f"Benchmark {scenario.name}", 0)
+    index += ".. toctree::\n   :maxdepth: 2\n\n" + "".join(f"   {pagename}\n" for pagename in pagenames)
+    srcdir.joinpath("index.rst").write_text(index, encoding="utf-8")
+    for number, pagename in enumerate(pagenames):
+        metadata = f":pdf-title: Page {number}\n:pdf-filename: {pagename}\n:pdf-revision: 1.0\n\n"
+        srcdir.joinpath(f"{pagename}.rst").write_text(metadata + scenario.page(f"Page {number}"), encoding="utf-8")
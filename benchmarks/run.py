@@ -0,0 +1,234 @@
+"""Build synthetic Sphinx projects and time each stage of their conversion to PDF.
+
+Usage::
+
+    python benchmarks/run.py [--scenarios NAME ...] [--themes NAME ...] [--output FILE] [--compare FILE]
+
+The results are written to a JSON file, by default ``benchmarks/results/<version>.json``, so the results of two
+releases can be compared with ``--compare``.
+"""
+
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import tempfile
+from datetime import datetime, timezone
+from importlib import metadata
+from importlib.util import find_spec
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Any, Dict, List, Optional, Tuple
+
+from projects import DEFAULT_SCENARIOS, SCENARIOS, Scenario, write_project
+from sphinx.cmd.build import build_main
+
+from sphinx_pdf_generate.cli import GLOBAL_OPTIONS
+from sphinx_pdf_generate.logging import get_logger
+from sphinx_pdf_generate.options import Options
+from sphinx_pdf_generate.renderer import Renderer
+from sphinx_pdf_generate.timing import StageTimer
+from sphinx_pdf_generate.utils import (
+    get_pdf_metadata,
+    h1_title_tag,
+    parse_html,
+    secure_filename,
+)
+from sphinx_pdf_generate.version import __version__
+
+# Bundled theme handlers and the Sphinx theme each of them is written for
+THEME_HANDLERS: Dict[str, str] = {
+    "alabaster": "alabaster",
+    "generic": "classic",
+    "sphinx_material": "sphinx_material",
+    "sphinx_immaterial": "sphinx_immaterial",
+}
+# Sphinx theme used to build the pages when the theme of a handler is not installed
+FALLBACK_HTML_THEME = "alabaster"
+PACKAGES = ["sphinx", "weasyprint", "beautifulsoup4", "lxml", "html5lib", "jinja2"]
+
+
+def _html_theme(theme_handler: str) -> str:
+    html_theme = THEME_HANDLERS[theme_handler]
+    if html_theme in ("alabaster", "classic") or find_spec(html_theme) is not None:
+        return html_theme
+    return FALLBACK_HTML_THEME
+
+
+def _build_html(scenario: Scenario, html_theme: str, workdir: Path) -> Tuple[Path, Path, float]:
+    """Write the Sphinx project of a scenario and build it with ``html_theme``."""
+    srcdir = workdir.joinpath(scenario.name, html_theme, "source")
+    outdir = workdir.joinpath(scenario.name, html_theme, "html")
+    write_project(scenario, srcdir, html_theme)
+    start = timer()
+    status = build_main(["-q", "-E", "-b", "html", str(srcdir), str(outdir)])
+    if status != 0:
+        raise RuntimeError(f"Sphinx could not build the {scenario.name} project with the {html_theme} theme")
+    return srcdir, outdir, timer() - start
+
+
+def _summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "total": sum(values),
+        "mean": statistics.mean(values),
+        "median": statistics.median(values),
+        "max": max(values),
+    }
+
+
+def run_benchmark(
+    scenario: Scenario, theme_handler: str, workdir: Path, builds: Dict[Tuple[str, str], Tuple[Path, Path, float]]
+) -> Dict[str, Any]:
+    """Convert every page of a scenario's project to PDF with ``theme_handler`` and time each stage.
+
+    :param builds: Projects already built by this run, by scenario name and Sphinx theme.
+    """
+    html_theme = _html_theme(theme_handler)
+    if (scenario.name, html_theme) not in builds:
+        builds[(scenario.name, html_theme)] = _build_html(scenario, html_theme, workdir)
+    srcdir, outdir, sphinx_build_time = builds[(scenario.name, html_theme)]
+    with open(outdir.joinpath("pdf_metadata.json"), encoding="utf-8") as json_file:
+        load_options = json.load(json_file)
+    config = dict(GLOBAL_OPTIONS, **load_options["GLOBAL_OPTIONS"])
+    config.update(outdir=str(outdir), srcdir=str(srcdir), theme_name=theme_handler)
+
+    start = timer()
+    logger = get_logger("sphinx-pdf-generate")
+    options = Options(config, logger)
+    renderer = Renderer(options=options, config=config)
+    renderer.warm_up()
+    setup_time = timer() - start
+
+    stages: Dict[str, List[float]] = {}
+    pages = 0
+    start = timer()
+    for pagename, page_metadata in load_options["LOCAL_OPTIONS"].items():
+        pdf_meta = get_pdf_metadata(page_metadata)
+        if not pdf_meta.get("build"):
+            continue
+        html_path = outdir.joinpath(f"{pagename}.html")
+        html_content = html_path.read_text(encoding="utf-8")
+        options.rst_src_path = srcdir.joinpath(f"{pagename}.rst")
+        options.out_dest_path = html_path.parent
+        pdf_file = secure_filename(pdf_meta.get("filename") or Path(pagename).name) + ".pdf"
+        pdf_path = html_path.parent.joinpath(pdf_file)
+
+        stage_timer = StageTimer()
+        with stage_timer.stage("parse"):
+            soup = parse_html(html_content, options.html_parser)
+        options.body_title = h1_title_tag(soup, pdf_meta.get("title"))
+        renderer.write_pdf(soup, html_path.with_suffix("").as_uri(), str(pdf_path), pdf_meta, stage_timer)
+        with stage_timer.stage("modify_html"):
+            renderer.add_link(html_content, pdf_file)
+
+        for stage, seconds in stage_timer.stages.items():
+            stages.setdefault(stage, []).append(seconds)
+        pages += 1
+    convert_time = timer() - start
+
+    return {
+        "scenario": scenario.name,
+        "description": scenario.description,
+        "theme_handler": theme_handler,
+        "html_theme": html_theme,
+        "pages": pages,
+        "sphinx_build": sphinx_build_time,
+        "setup": setup_time,
+        "convert": convert_time,
+        "pages_per_second": pages / convert_time if convert_time else 0,
+        "stages": {stage: _summarize(values) for stage, values in stages.items()},
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    packages = {}
+    for package in PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+    return {
+        "sphinx_pdf_generate": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": packages,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def _print_results(results: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> None:
+    baseline_results = {}
+    if baseline is not None:
+        baseline_results = {(result["scenario"], result["theme_handler"]): result for result in baseline["results"]}
+
+    for result in results:
+        print(
+            f"\n{result['scenario']} / {result['theme_handler']} ({result['html_theme']} HTML): "
+            f"{result['pages']} page(s) in {result['convert']:.2f}s, {result['pages_per_second']:.1f} page(s)/s, "
+            f"setup {result['setup']:.2f}s, Sphinx build {result['sphinx_build']:.2f}s"
+        )
+        previous = baseline_results.get((result["scenario"], result["theme_handler"]))
+        for stage, summary in result["stages"].items():
+            line = f"  {stage:<14} total {summary['total']:8.3f}s  mean {summary['mean'] * 1000:9.1f}ms"
+            line += f"  max {summary['max'] * 1000:9.1f}ms"
+            if previous is not None and stage in previous["stages"]:
+                previous_total = previous["stages"][stage]["total"]
+                if previous_total:
+                    line += f"  {summary['total'] / previous_total:6.2f}x baseline"
+            print(line)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the conversion of synthetic Sphinx projects to PDF.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=list(SCENARIOS), default=DEFAULT_SCENARIOS, help="projects to benchmark"
+    )
+    parser.add_argument(
+        "--themes", nargs="+", choices=list(THEME_HANDLERS), default=list(THEME_HANDLERS), help="theme handlers to use"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path(__file__).parent.joinpath("results", f"{__version__}.json"),
+        help="JSON file to write the results to",
+    )
+    parser.add_argument("--compare", type=Path, help="JSON file with the results of a previous run to compare with")
+    parser.add_argument(
+        "--workdir", type=Path, help="directory to write the synthetic projects to (default: a temporary directory)"
+    )
+    return parser
+
+
+def main() -> int:
+    args = get_parser().parse_args()
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as json_file:
+            baseline = json.load(json_file)
+
+    logging.getLogger("weasyprint").setLevel(logging.ERROR)
+    results = []
+    builds = {}
+    with tempfile.TemporaryDirectory(prefix="pdfgen-benchmarks-") as tmpdir:
+        workdir = args.workdir or Path(tmpdir)
+        for name in args.scenarios:
+            for theme_handler in args.themes:
+                print(f"Running {name} with the {theme_handler} theme handler", file=sys.stderr)
+                results.append(run_benchmark(SCENARIOS[name], theme_handler, workdir, builds))
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as json_file:
+        json.dump({**_environment(), "results": results}, json_file, indent=4)
+
+    _print_results(results, baseline)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,8 @@
-from sphinx_pdf_generate.pdf_generate import setup  # noqa: F401
+from typing import Any, Dict
+
+
+def setup(app: Any) -> Dict[str, Any]:
+    """Set up the Sphinx extension. The extension is imported on first use, so importing the package stays cheap."""
+    from sphinx_pdf_generate.pdf_generate import setup as setup_extension
+
+    return setup_extension(app)
@@ -1,9 +1,10 @@
 """Logic for interacting with sphinx-build."""
 
 import shlex
+import shutil
 import subprocess
 import sys
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from colorama import Fore, Style
 
@@ -45,16 +46,22 @@ def show(*, context: Optional[str] = None, command: Union[list, tuple, None] = N
         _log(context, colour=Fore.RED)
 
 
-def get_builder(sphinx_args: List[str]) -> int:
-    """Prepare the function that calls sphinx."""
+def get_builder(sphinx_args: List[str], fresh: bool = False) -> int:
+    """Prepare the function that calls sphinx.
+
+    :param sphinx_args: Arguments forwarded to ``sphinx-build``. The last one is the output directory.
+    :param fresh: Remove the output directory first, so that Sphinx and the PDF conversion start from scratch.
+    """
     sphinx_command = [sys.executable, "-m", "sphinx"] + sphinx_args
 
     def build() -> int:
         """Generate the documentation using ``sphinx``."""
 
         try:
-            remove_dir_command = ["rm", "-fr", sphinx_args[-1]]
-            subprocess.run(remove_dir_command, check=True)
+            if fresh:
+                remove_dir_command = ["rm", "-fr", sphinx_args[-1]]
+                show(command=remove_dir_command)
+                subprocess.run(remove_dir_command, check=True)
             show(command=["sphinx-build"] + sphinx_args)
             sphinx_build = subprocess.run(sphinx_command, check=True)
             return sphinx_build.returncode
@@ -63,3 +70,56 @@ def get_builder(sphinx_args: List[str]) -> int:
             return e.returncode
 
     return build()
+
+
+class BuildCapture:
+    """Rendered HTML pages and PDF metadata of a Sphinx build running in the same process as the CLI."""
+
+    def __init__(self):
+        self.pages: Dict[str, str] = {}
+        self.metadata: Optional[Dict[str, Any]] = None
+
+    def capture_templates(self, templates: Any) -> None:
+        """Keep a copy of each page rendered by the HTML builder's template bridge.
+
+        Pages written by parallel processes (``sphinx-build -j``) are not captured. They are read from the output
+        directory instead.
+        """
+        render = templates.render
+
+        def render_and_capture(template_name: str, context: Dict[str, Any]) -> str:
+            output = render(template_name, context)
+            if "pagename" in context:
+                self.pages[context["pagename"]] = output
+            return output
+
+        templates.render = render_and_capture
+
+
+# Set while ``build_in_process`` runs, so that the Sphinx extension can hand its data to the CLI.
+_build_capture: Optional[BuildCapture] = None
+
+
+def get_build_capture() -> Optional[BuildCapture]:
+    return _build_capture
+
+
+def build_in_process(sphinx_args: List[str], fresh: bool = False) -> Tuple[int, BuildCapture]:
+    """Run Sphinx in the current process and capture the pages and PDF metadata it generates.
+
+    :param sphinx_args: Arguments forwarded to ``sphinx-build``. The last one is the output directory.
+    :param fresh: Remove the output directory first, so that Sphinx and the PDF conversion start from scratch.
+    :return: The exit code of Sphinx and the captured build data.
+    """
+    global _build_capture
+    from sphinx.cmd.build import build_main
+
+    if fresh:
+        show(command=["rm", "-fr", sphinx_args[-1]])
+        shutil.rmtree(sphinx_args[-1], ignore_errors=True)
+    show(command=["sphinx-build"] + sphinx_args)
+    _build_capture = BuildCapture()
+    try:
+        return build_main(sphinx_args), _build_capture
+    finally:
+        _build_capture = None
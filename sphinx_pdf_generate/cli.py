@@ -4,38 +4,62 @@ import argparse
 import json
 import os
 from pathlib import Path
-from typing import Dict
+from timeit import default_timer as timer
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 import colorama
 
-from .build import SPHINX_BUILD_OPTIONS, get_builder, show
-from .pdf_generate import PdfGeneratePlugin
+from .build import SPHINX_BUILD_OPTIONS, build_in_process, get_builder, show
+from .manifest import Manifest
+from .profiling import (
+    AGGREGATED_PROFILE_FILENAME,
+    aggregate_profiles,
+    get_profile_dir,
+    get_profile_path,
+)
+from .timing import format_stages, slowest_pages, write_timing_report
+from .utils import HTML_PARSERS
 from .version import __version__
 
-GLOBAL_OPTIONS = {}.update(
-    verbose=False,
-    site_url="http://127.0.0.1:8000",
-    debug=False,
-    debug_target=None,
-    author=None,
-    author_logo=None,
-    copyright=None,
-    disclaimer=None,
-    cover=True,
-    cover_title=None,
-    cover_subtitle=None,
-    custom_template_path="_templates",
-    theme_handler_path=None,
-    plugin_handler_path=None,
-    custom_css_path=None,
-    toc=True,
-    toc_numbering=True,
-    toc_title="Table of Contents",
-    toc_level=4,
-    cover_images=None,
-    theme_name="alabaster",
-    templates_path=[],
-)
+# The modules converting pages import Sphinx, WeasyPrint and pypdf. They are imported once the conversion starts, so
+# that e.g. ``sphinx-pdf-generate --version`` does not pay for them.
+if TYPE_CHECKING:
+    from .pdf_generate import PdfGeneratePlugin
+
+
+GLOBAL_OPTIONS = {
+    "verbose": False,
+    "site_url": "http://127.0.0.1:8000",
+    "debug": False,
+    "debug_target": None,
+    "author": None,
+    "author_logo": None,
+    "copyright": None,
+    "disclaimer": None,
+    "cover": True,
+    "cover_title": None,
+    "cover_subtitle": None,
+    "custom_template_path": "_templates",
+    "theme_handler_path": None,
+    "plugin_handler_path": None,
+    "custom_css_path": None,
+    "toc": True,
+    "toc_numbering": True,
+    "toc_title": "Table of Contents",
+    "toc_level": 4,
+    "cover_images": None,
+    "theme_name": "alabaster",
+    "templates_path": [],
+    "html_parser": None,
+    "profile": False,
+    "combined": False,
+    "combined_filename": None,
+    "image_dpi": None,
+    "jpeg_quality": None,
+    "optimize_images": False,
+    "image_cache_size": 64,
+    "image_cache_on_disk": False,
+}
 
 
 def _get_build_args(args):
@@ -55,6 +79,30 @@ def _get_build_args(args):
     return build_args
 
 
+def _jobs(value: str) -> int:
+    if value == "auto":
+        from .workers import available_jobs
+
+        return available_jobs()
+    try:
+        jobs = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer or 'auto', got {value!r}")
+    if jobs < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer or 'auto', got {value!r}")
+    return jobs
+
+
+def _positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return number
+
+
 def get_parser():
     """Get the application's argument parser.
 
@@ -92,11 +140,319 @@ def get_parser():
                 metavar=meta,
             )
 
+    parser.add_argument(
+        "--jobs",
+        type=_jobs,
+        default=1,
+        metavar="N",
+        help="number of processes used to convert pages to PDF, or 'auto' to use every available CPU",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help=(
+            "remove the output directory before building, so that every page is built by Sphinx and converted to PDF"
+            "\nagain (by default, only the pages whose PDF file is out of date are converted)"
+        ),
+    )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="run Sphinx in this process and convert the rendered pages from memory instead of re-reading them",
+    )
+    parser.add_argument(
+        "--html-parser",
+        choices=HTML_PARSERS,
+        help="HTML parser used to prepare the pages for PDF conversion, instead of pdfgen_html_parser from conf.py",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=5,
+        metavar="N",
+        help="number of the slowest pages to show with the time spent in each stage of their conversion",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the conversion of every page with cProfile, like pdfgen_profile in conf.py",
+    )
+    parser.add_argument(
+        "--max-pages-per-worker",
+        type=_positive_int,
+        metavar="N",
+        help=(
+            "replace the worker processes once one of them converted N pages, to release the memory they hold"
+            "\n(worker processes are used even with --jobs 1)"
+        ),
+    )
+    parser.add_argument(
+        "--max-rss",
+        type=_positive_int,
+        metavar="MB",
+        help=(
+            "replace the worker processes once the memory usage of one of them reached MB megabytes"
+            "\n(worker processes are used even with --jobs 1)"
+        ),
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help=(
+            "read the HTML pages and write the PDF and HTML files in background threads while pages are rendered"
+            "\n(only when pages are converted in this process, worker processes already overlap them)"
+        ),
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="convert the pages in this process even if a render daemon (sphinx-pdf-generate-daemon) is running",
+    )
+    parser.add_argument(
+        "--daemon-socket",
+        type=Path,
+        metavar="PATH",
+        help=(
+            "Unix socket of the render daemon, instead of $SPHINX_PDF_GENERATE_SOCKET or the default path"
+            "\n(the pages are converted in this process when no daemon is running)"
+        ),
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "build again and convert the affected pages whenever the sources, templates or CSS files change, keeping"
+            "\nSphinx and the renderer loaded in this process between builds (press Ctrl+C to stop)"
+        ),
+    )
     parser.add_argument("sourcedir", help="source directory")
     parser.add_argument("outdir", help="output directory for built documentation")
     return parser
 
 
+def _load_pdf_metadata(outdir: str) -> Dict[str, Dict]:
+    metadata_options_file = Path(outdir).joinpath("pdf_metadata.json")
+    if not os.path.exists(metadata_options_file):
+        raise PDFGenerateException(
+            f"The The PDF metadata file, 'pdf_metadata.json', not found in the output directory. Check: {outdir}"
+        )
+
+    with open(metadata_options_file) as json_file:
+        return json.load(json_file)
+
+
+def _combine_pages(outdir: str, manifest: Manifest, toctree: List[Dict], global_config: Dict) -> None:
+    from .combine import combine_pdfs, combined_filename
+
+    start = timer()
+    filename = combined_filename(global_config.get("combined_filename"))
+    try:
+        combined_path = combine_pdfs(outdir, manifest, toctree, filename)
+    except ValueError as e:
+        show(context=str(e), error=True)
+        return
+    if combined_path is None:
+        show(context="No PDF file was found to combine", error=True)
+    else:
+        show(context=f"Combining the PDF files into {combined_path} took {timer() - start:.1f}s")
+
+
+def _convert_pages(
+    args: argparse.Namespace,
+    srcdir: str,
+    outdir: str,
+    load_options: Dict[str, Dict],
+    html_pages: Optional[Dict[str, str]] = None,
+    pdf_generator: Optional["PdfGeneratePlugin"] = None,
+) -> "PdfGeneratePlugin":
+    """Convert the pages described by the PDF metadata of a Sphinx build and print a summary.
+
+    :param pdf_generator: Plugin set up by a previous call, reused with its renderer if the global options did not
+        change. The pages are then converted in this process.
+    :return: The plugin that converted the pages.
+    """
+    from .daemon import convert_pages_with_daemon
+    from .pdf_generate import PdfGeneratePlugin
+    from .pipeline import convert_pages_pipelined
+    from .workers import convert_pages_in_pool, try_convert_page
+
+    html_pages = {} if html_pages is None else html_pages
+    global_config = load_options["GLOBAL_OPTIONS"] if "GLOBAL_OPTIONS" in load_options else GLOBAL_OPTIONS
+    local_config = load_options.get("LOCAL_OPTIONS")
+
+    if not local_config:
+        raise PDFGenerateException(
+            f"The PDF metadata file does not contain information about the local options. "
+            f"Check the file for more information: {Path(outdir).joinpath('pdf_metadata.json')}."
+        )
+
+    global_config.update(outdir=outdir, srcdir=srcdir)
+    if args.html_parser:
+        global_config.update(html_parser=args.html_parser)
+    if args.profile:
+        global_config.update(profile=True)
+    # Every page is handed over: the manifest tells which pages have their download link and an up to date PDF file,
+    # without reading them. The other pages are converted, including the pages written again by another build, e.g.
+    # ``make html``, the pages whose conversion failed, and every page once the stylesheets or templates changed.
+    pages = local_config
+    if "UPDATED_PAGES" in load_options and len(load_options["UPDATED_PAGES"]) < len(local_config):
+        show(context=f"Sphinx rewrote {len(load_options['UPDATED_PAGES'])} of {len(local_config)} page(s)")
+
+    warm = pdf_generator is not None and pdf_generator.config == global_config
+    if warm:
+        pdf_generator.reset()
+    else:
+        pdf_generator = PdfGeneratePlugin()
+    jobs = max(min(args.jobs, len(pages)), 1)
+    start = timer()
+
+    # Worker processes can be replaced to bound memory usage, the current process cannot
+    use_pool = not warm and (jobs > 1 or args.max_pages_per_worker is not None or args.max_rss is not None)
+    if not warm:
+        pdf_generator.manifest = Manifest.load(outdir)
+    # Errors converting a page are shown and counted and the next page is converted, whichever way the pages are
+    # converted. The manifest is saved even if the conversion stops, so that the pages converted so far are kept.
+    try:
+        if use_pool:
+            if args.pipeline:
+                show(context="The --pipeline option is ignored when pages are converted by worker processes")
+            show(context=f"Converting {len(pages)} page(s) to PDF using {jobs} worker process(es)")
+            convert_pages_in_pool(
+                pdf_generator, global_config, pages, jobs, html_pages, args.max_pages_per_worker, args.max_rss
+            )
+        else:
+            pages_left = pages
+            if not warm and not args.no_daemon:
+                # A running render daemon has its renderers loaded already, otherwise the pages are converted here
+                pages_left = convert_pages_with_daemon(
+                    pdf_generator, global_config, pages, html_pages, args.daemon_socket
+                )
+            if pages_left and not warm:
+                # Set up the renderer, keeping the manifest entries of the pages the daemon converted
+                manifest = pdf_generator.manifest
+                pdf_generator.on_config(global_config)
+                pdf_generator.manifest = manifest
+            if pages_left and args.pipeline:
+                convert_pages_pipelined(pdf_generator, outdir, pages_left, html_pages)
+            else:
+                for html_pagename, html_metadata in pages_left.items():
+                    try_convert_page(
+                        pdf_generator, outdir, html_pagename, html_metadata, html_pages.pop(html_pagename, None)
+                    )
+    finally:
+        for pagename in pages:
+            pdf_generator.manifest.record_link(pagename, Path(outdir).joinpath(f"{pagename}.html"))
+        pdf_generator.manifest.prune(local_config)
+        pdf_generator.manifest.save()
+
+    if global_config.get("combined"):
+        _combine_pages(outdir, pdf_generator.manifest, load_options.get("TOCTREE", []), global_config)
+
+    summary = f"Converting {pdf_generator.pdf_num_files} file(s) to PDF took {pdf_generator.total_time:.1f}s"
+    if use_pool:
+        summary += f" ({timer() - start:.1f}s wall time with {jobs} worker(s))"
+    show(context=summary)
+    if pdf_generator.peak_worker_rss > 0:
+        memory = f"Peak memory usage of a worker process was {pdf_generator.peak_worker_rss:.0f} MB"
+        if pdf_generator.worker_recycles > 0:
+            memory += f", the worker processes were replaced {pdf_generator.worker_recycles} time(s)"
+        show(context=memory)
+    if pdf_generator.font_setup_time > 0:
+        show(
+            context=f"Setting up fonts took {pdf_generator.font_setup_time:.1f}s, reusing them for every page saved "
+            f"about {pdf_generator.font_setup_saved:.1f}s"
+        )
+    link_lookups = pdf_generator.link_cache_hits + pdf_generator.link_cache_misses
+    if link_lookups > 0:
+        show(
+            context=f"Looked up {link_lookups} link(s) to rewrite, "
+            f"{pdf_generator.link_cache_hits / link_lookups:.0%} of them were found in the cache"
+        )
+    if pdf_generator.image_cache_hits + pdf_generator.image_cache_misses > 0:
+        show(
+            context=f"Image cache: {pdf_generator.image_cache_hits} hit(s), "
+            f"{pdf_generator.image_cache_misses} miss(es)"
+        )
+    if pdf_generator.pdf_skipped_files > 0:
+        show(context=f"{pdf_generator.pdf_skipped_files} unchanged PDF file(s) were kept from the previous build")
+
+    if pdf_generator.page_timings:
+        report_path = write_timing_report(outdir, pdf_generator.page_timings)
+        if args.slowest > 0:
+            show(context=f"Slowest page(s), see {report_path} for the timings of every page:")
+            for pagename, page_timing in slowest_pages(pdf_generator.page_timings, args.slowest):
+                stages = format_stages(page_timing["stages"], 5)
+                show(context=f"  {page_timing.get('total', 0):.2f}s {pagename} ({stages})")
+
+    if global_config.get("profile"):
+        profile_files = [get_profile_path(outdir, pagename) for pagename in pages]
+        profile_dir = get_profile_dir(outdir)
+        aggregated_profile = aggregate_profiles(profile_files, profile_dir.joinpath(AGGREGATED_PROFILE_FILENAME))
+        if aggregated_profile is not None:
+            show(context=f"Profiles of the page conversions saved to {profile_dir}, all pages: {aggregated_profile}")
+
+    if pdf_generator.num_errors > 0:
+        show(context=f"{pdf_generator.num_errors} conversion errors occurred (see above)", error=True)
+    return pdf_generator
+
+
+def _watch(args: argparse.Namespace, srcdir: str, outdir: str, build_args: List[str]) -> None:
+    """Build the project and convert the out of date pages, then do it again whenever the watched files change.
+
+    Sphinx runs in this process, so its modules stay imported and each build reads only the changed sources. The
+    plugin converting the pages is kept between builds, with its fonts, stylesheets, handlers and templates loaded.
+    Every page goes through the manifest check in each round, so a change to the CSS, templates or handlers, which
+    Sphinx does not rewrite any page for, converts every page again.
+    """
+    from .watch import FileWatcher, watched_paths
+
+    if args.jobs > 1 or args.max_pages_per_worker is not None or args.max_rss is not None:
+        show(context="The --jobs, --max-pages-per-worker and --max-rss options are ignored with --watch")
+    # The renderer kept between builds converts the pages in this process
+    args = argparse.Namespace(
+        **{**vars(args), "jobs": 1, "max_pages_per_worker": None, "max_rss": None, "no_daemon": True}
+    )
+    confdir = os.path.realpath(args.c[-1]) if args.c else None
+    doctreedir = os.path.realpath(args.d[-1]) if args.d else os.path.join(outdir, ".doctrees")
+    ignored = [outdir, doctreedir, os.path.join(os.path.dirname(outdir), "pdf_html_debug")]
+    paths = watched_paths(srcdir, confdir, {})
+    watcher = FileWatcher(paths, ignored)
+    pdf_generator = None
+    fresh = args.fresh
+    try:
+        while True:
+            start = timer()
+            status, build_capture = build_in_process(build_args, fresh=fresh)
+            fresh = False
+            if status != 0:
+                show(context="Sphinx build was unsuccessful. No PDF files were generated.", error=True)
+            else:
+                try:
+                    load_options = build_capture.metadata or _load_pdf_metadata(outdir)
+                    pdf_generator = _convert_pages(
+                        args, srcdir, outdir, load_options, build_capture.pages, pdf_generator
+                    )
+                    show(context=f"Building and converting the pages took {timer() - start:.1f}s")
+                    # The templates, CSS and handlers are known once the options of the project are loaded
+                    config_paths = watched_paths(srcdir, confdir, pdf_generator.config)
+                    if config_paths != paths:
+                        paths = config_paths
+                        watcher = FileWatcher(paths, ignored)
+                except Exception as e:
+                    # Keep watching, the next change may fix the error
+                    show(context=f"Converting the pages failed: {e}", error=True)
+
+            show(context=f"Waiting for changes in {', '.join(str(path) for path in watcher.paths)} (Ctrl+C to stop)")
+            changed = watcher.wait()
+            names = ", ".join(os.path.relpath(path) for path in changed[:5])
+            show(context=f"{len(changed)} file(s) changed: {names}{', ...' if len(changed) > 5 else ''}")
+            if any(path.suffix == ".py" for path in changed):
+                # conf.py or a handler changed, the handlers are imported when the renderer is set up
+                pdf_generator = None
+    except KeyboardInterrupt:
+        show(context="Stopped watching")
+
+
 def main() -> None:
     """Actual application logic."""
     colorama.init()
@@ -115,44 +471,22 @@ def main() -> None:
         os.makedirs(outdir)
 
     build_args = _get_build_args(args)
-    builder = get_builder(build_args)
+    if args.watch:
+        _watch(args, srcdir, outdir, build_args)
+        return
+
+    load_options = html_pages = None
+    if args.in_process:
+        builder, build_capture = build_in_process(build_args, fresh=args.fresh)
+        load_options, html_pages = build_capture.metadata, build_capture.pages
+    else:
+        builder = get_builder(build_args, fresh=args.fresh)
 
     if builder == 0:
         # Load configuration
-        metadata_options_file = Path(outdir).joinpath("pdf_metadata.json")
-        if not os.path.exists(metadata_options_file):
-            raise PDFGenerateException(
-                f"The The PDF metadata file, 'pdf_metadata.json', not found in the output directory. Check: {outdir}"
-            )
-
-        with open(metadata_options_file) as json_file:
-            load_options: Dict[str, Dict] = json.load(json_file)
-
-        global_config = load_options["GLOBAL_OPTIONS"] if "GLOBAL_OPTIONS" in load_options else GLOBAL_OPTIONS
-        local_config = load_options.get("LOCAL_OPTIONS")
-
-        if not local_config:
-            raise PDFGenerateException(
-                f"The PDF metadata file does not contain information about the local options. "
-                f"Check the file for more information: {metadata_options_file}."
-            )
-
-        global_config.update(outdir=outdir, srcdir=srcdir)
-        pdf_generator = PdfGeneratePlugin()
-        pdf_generator.on_config(global_config)
-
-        for html_pagename, html_metadata in local_config.items():
-            html_page_path = Path(outdir).joinpath(f"{html_pagename}.html")
-            html_page_content = html_page_path.read_text(encoding="utf-8")
-            new_html_page_content = pdf_generator.convert_page_to_pdf(
-                html_content=html_page_content, pagename=html_pagename, page_metadata=html_metadata
-            )
-            html_page_path.write_text(data=new_html_page_content, encoding="utf-8")
-
-        show(context=f"Converting {pdf_generator.pdf_num_files} file(s) to PDF took {pdf_generator.total_time:.1f}s")
-
-        if pdf_generator.num_errors > 0:
-            show(context=f"{pdf_generator.num_errors} conversion errors occurred (see above)", error=True)
+        if load_options is None:
+            load_options = _load_pdf_metadata(outdir)
+        _convert_pages(args, srcdir, outdir, load_options, html_pages)
     else:
         show(context="Sphinx build was unsuccessful. No PDF files were generated.", error=True)
 
@@ -0,0 +1,88 @@
+"""Combine the PDF documents of the pages into a single PDF document, in the order of the toctrees."""
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import Destination, IndirectObject
+
+from .manifest import Manifest
+from .utils import secure_filename
+
+
+def _copy_outline(
+    writer: PdfWriter, reader: PdfReader, outline: List[Any], offset: int, parent: Optional[IndirectObject]
+) -> List[IndirectObject]:
+    """Add the outline items of a page's PDF document to the combined document, under ``parent``.
+
+    :param offset: Page number of the first page of the page's PDF document in the combined document.
+    :return: The outline items added at the top level of ``outline``.
+    """
+    items: List[IndirectObject] = []
+    for entry in outline:
+        if isinstance(entry, list):
+            # Children of the previous outline item
+            if items:
+                _copy_outline(writer, reader, entry, offset, items[-1])
+            continue
+        if not isinstance(entry, Destination):
+            continue
+        page_number = reader.get_destination_page_number(entry)
+        if page_number is None or page_number < 0:
+            page_number = 0
+        items.append(writer.add_outline_item(entry.title or "", offset + page_number, parent=parent))
+    return items
+
+
+def combined_filename(name: Optional[str]) -> str:
+    """File name of the combined PDF document, from the ``pdfgen_combined_filename`` option."""
+    return f"{secure_filename(name or '') or 'combined'}.pdf"
+
+
+def combine_pdfs(
+    outdir: Union[str, Path], manifest: Manifest, toctree: List[Dict[str, Any]], filename: str
+) -> Optional[Path]:
+    """Append the PDF documents of the pages to a single PDF document written to ``filename`` in ``outdir``.
+
+    The pages laid out for each PDF document are reused as they are. The outline of every PDF document is added to the
+    combined document, nested under the outline of the page whose toctree includes it.
+
+    :param manifest: Manifest listing the PDF document generated for each page.
+    :param toctree: Pages in the order of the toctrees, with their title and nesting level, as saved by the Sphinx
+        extension in the ``TOCTREE`` section of the PDF metadata file.
+    :return: Path of the combined PDF document, or None if no page has a PDF document.
+    :raises ValueError: if ``filename`` is the PDF document of a page, which the combined document would overwrite.
+    """
+    outdir = Path(outdir)
+    for docname, page_entry in manifest.entries.items():
+        if page_entry.get("pdf") == filename:
+            raise ValueError(
+                f"The combined PDF document would overwrite {filename}, the PDF document of {docname}. "
+                f"Set pdfgen_combined_filename to another name."
+            )
+    writer = PdfWriter()
+    # Outline item of the last page seen at each nesting level
+    parents: List[Optional[IndirectObject]] = []
+    for page in toctree:
+        entry = manifest.entries.get(page["docname"])
+        if entry is None or not outdir.joinpath(entry["pdf"]).is_file():
+            continue
+        reader = PdfReader(outdir.joinpath(entry["pdf"]))
+        offset = len(writer.pages)
+        writer.append(reader, import_outline=False)
+
+        # The root document and the pages it includes are at the top level of the outline
+        level = min(max(page["level"] - 1, 0), len(parents))
+        parent = parents[level - 1] if level > 0 else None
+        items = _copy_outline(writer, reader, reader.outline, offset, parent)
+        if not items:
+            items = [writer.add_outline_item(page["title"], offset, parent=parent)]
+        del parents[level:]
+        parents.append(items[0])
+
+    if not writer.pages:
+        return None
+    path = outdir.joinpath(filename)
+    with open(path, "wb") as pdf_file:
+        writer.write(pdf_file)
+    return path
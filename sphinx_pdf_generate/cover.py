@@ -1,10 +1,13 @@
+import copy
 import re
+from collections import ChainMap
+from functools import lru_cache
 from typing import Any, Dict, Optional
 
-from bs4 import BeautifulSoup, PageElement, Tag
+from bs4 import PageElement, Tag
 
 from .options import Options
-from .templates.filters.url import URLFilter
+from .utils import parse_html
 
 
 def make_cover(soup: PageElement, options: Options, config: Dict[str, Any], pdf_metadata: Optional[Dict] = None):
@@ -21,25 +24,23 @@ def make_cover(soup: PageElement, options: Options, config: Dict[str, Any], pdf_
 
 def _make_cover(soup: PageElement, options: Options, config: Dict[str, Any], pdf_metadata: Optional[Dict] = None):
     try:
+        pdf_metadata = {} if pdf_metadata is None else pdf_metadata
         keywords = options.template.keywords
-        keywords["site_url"] = re.sub(r"http://|https://", "", keywords["site_url"])
-        # Set cover title
-        keywords["cover_title"] = pdf_metadata.get("title") or options.body_title or keywords["cover_title"]
-        # Set cover image
         document_type: str = pdf_metadata.get("type", "Documentation")
-        path_filter = URLFilter(options, config)
-        if options.cover_images is not None:
-            cover_images = {
-                str(img_k).lower(): path_filter(pathname=str(img_v)) for img_k, img_v in options.cover_images.items()
-            }
-            keywords["cover_image"] = cover_images.get(document_type.lower()) or cover_images.get("default")
-        # Set cover sub_title
-        keywords["cover_subtitle"] = (
-            pdf_metadata.get("subtitle") or document_type.capitalize() or keywords["cover_subtitle"]
-        )
-        keywords["revision"] = pdf_metadata.get("revision") or None
+        page_keywords = {
+            "site_url": re.sub(r"http://|https://", "", keywords["site_url"]),
+            # Set cover title
+            "cover_title": pdf_metadata.get("title") or options.body_title or keywords["cover_title"],
+            # Set cover sub_title
+            "cover_subtitle": pdf_metadata.get("subtitle") or document_type.capitalize() or keywords["cover_subtitle"],
+            "revision": pdf_metadata.get("revision") or None,
+        }
+        # Set cover image
+        cover_images = options.template.cover_images
+        if cover_images is not None:
+            page_keywords["cover_image"] = cover_images.get(document_type.lower()) or cover_images.get("default")
         # Populate local options into template keywords
-        keywords.update(pdf_metadata)
+        page_keywords.update(pdf_metadata)
 
         # Select cover template
         cover_template_files = [document_type.lower(), "cover", "default_cover"]
@@ -47,14 +48,18 @@ def _make_cover(soup: PageElement, options: Options, config: Dict[str, Any], pdf
 
         options.logger.info(f'Generate cover page for PDF document using "{template.name}" template.')
 
-        def str_to_bs4(html_like_str: str) -> Tag:
-            html_soup = BeautifulSoup(html_like_str, "html5lib")
-            html_tags = html_soup.body.find()
-            return html_tags
-
-        cover_template = str(template.render(keywords))
-        cover_html = str_to_bs4(cover_template)
+        cover_template = str(template.render(ChainMap(page_keywords, keywords)))
+        cover_html = copy.copy(_parse_cover(cover_template, options.html_parser))
 
         soup.body.insert(0, cover_html)
     except Exception as e:
         options.logger.error("Failed to generate the cover page: %s", e)
+
+
+@lru_cache(maxsize=32)
+def _parse_cover(html_like_str: str, parser: str) -> Tag:
+    """Parse a rendered cover template. The result is cached, so it must be copied before it is used."""
+    html_soup = parse_html(html_like_str, parser)
+    # Only some parsers wrap a fragment in <html> and <body> tags
+    html_tags = (html_soup.body or html_soup).find()
+    return html_tags
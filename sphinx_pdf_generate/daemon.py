@@ -0,0 +1,298 @@
+"""Render daemon keeping renderers loaded between runs of the CLI tool, reached over a local Unix socket.
+
+The CLI tool sends one JSON line per run, with the global options of the project and the pages to convert. The
+daemon converts the pages with a renderer set up for those options, kept loaded for the next runs, and sends one JSON
+line per page with its counters, manifest entry, stage timings and console output, then a last line once it is done.
+"""
+
+import argparse
+import gc
+import getpass
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+from collections import OrderedDict
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, cast
+
+from .build import show
+from .version import __version__
+
+# The modules converting pages are imported once the daemon receives pages, like in the CLI tool
+if TYPE_CHECKING:
+    from .pdf_generate import PdfGeneratePlugin
+
+# Environment variable holding the path of the socket, used by the daemon and the CLI tool
+SOCKET_ENV_VAR = "SPHINX_PDF_GENERATE_SOCKET"
+# Renderers kept loaded, one per project and set of global options, the least recently used is dropped first
+MAX_RENDERERS = 8
+
+
+def default_socket_path() -> Path:
+    """Socket path from the environment, or in the user's runtime directory, or in the temporary directory."""
+    if os.environ.get(SOCKET_ENV_VAR):
+        return Path(os.environ[SOCKET_ENV_VAR])
+    if os.environ.get("XDG_RUNTIME_DIR"):
+        return Path(os.environ["XDG_RUNTIME_DIR"]).joinpath("sphinx-pdf-generate.sock")
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return Path(tempfile.gettempdir()).joinpath(f"sphinx-pdf-generate-{user}.sock")
+
+
+def convert_pages_with_daemon(
+    pdf_generator: "PdfGeneratePlugin",
+    global_config: Dict[str, Any],
+    pages: Dict[str, Dict[str, Any]],
+    html_pages: Optional[Dict[str, str]] = None,
+    socket_path: Optional[Path] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Convert ``pages`` with the render daemon, if one is running, and add its results to ``pdf_generator``.
+
+    :param pdf_generator: Plugin instance collecting the counters, manifest entries and page timings of the daemon.
+    :param html_pages: Mapping of page names to HTML content already in memory. Pages missing from it are read from
+        the output directory by the daemon.
+    :return: The pages left to convert in this process: all of them when no daemon is running, or the pages the
+        daemon did not convert if it stopped or refused them.
+    """
+    if not hasattr(socket, "AF_UNIX") or not pages:
+        return pages
+    socket_path = default_socket_path() if socket_path is None else Path(socket_path)
+    html_pages = {} if html_pages is None else html_pages
+    if not _is_own_socket(socket_path):
+        if os.path.lexists(socket_path):
+            show(
+                context=f"Not using the render daemon at {socket_path}: it is not a socket owned by the current user",
+                error=True,
+            )
+        # Otherwise no daemon is running
+        return pages
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+    except OSError:
+        # No daemon is running
+        client.close()
+        return pages
+
+    show(context=f"Converting {len(pages)} page(s) to PDF with the render daemon at {socket_path}")
+    request = {
+        "version": __version__,
+        "cwd": os.getcwd(),
+        "global_config": global_config,
+        "pages": [
+            {"pagename": pagename, "metadata": page_metadata, "html": html_pages.get(pagename)}
+            for pagename, page_metadata in pages.items()
+        ],
+    }
+    pages_left = dict(pages)
+    with client, client.makefile("rwb") as stream:
+        try:
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            for line in stream:
+                message = json.loads(line)
+                if "error" in message:
+                    show(context=f"The render daemon did not convert the pages: {message['error']}", error=True)
+                    break
+                if message.get("done"):
+                    break
+                print(message["output"], end="")
+                pdf_generator.merge_page_result(message["pagename"], message)
+                pages_left.pop(message["pagename"], None)
+        except (OSError, ValueError) as e:
+            show(context=f"Lost the connection to the render daemon: {e}", error=True)
+    if pages_left:
+        show(context=f"Converting the {len(pages_left)} page(s) left in this process")
+    return pages_left
+
+
+class RenderDaemon:
+    """Converts pages with plugins set up once per project and set of global options, then kept loaded.
+
+    A plugin is reused when the same project is converted again with the same options, with its fonts, parsed
+    stylesheets, handlers and templates loaded. See :meth:`PdfGeneratePlugin.reset`. It is set up again once the
+    theme or plugin handler of the project changed, since the handlers are imported when it is set up.
+    """
+
+    def __init__(self, max_renderers: int = MAX_RENDERERS):
+        self.max_renderers = max_renderers
+        # Plugins by project and options, with the handler files they were set up with
+        self._plugins: "OrderedDict[str, Tuple[List[Tuple[str, int, int]], PdfGeneratePlugin]]" = OrderedDict()
+
+    def convert(self, request: Dict[str, Any], send: Callable[[Dict[str, Any]], None]) -> None:
+        """Convert the pages of a request and send the result of each page as soon as it is converted."""
+        from . import manifest
+        from .workers import try_convert_page
+
+        # Handler paths are relative to the directory the CLI tool runs in
+        os.chdir(request["cwd"])
+        global_config = request["global_config"]
+        pdf_generator = self._plugin(manifest.fingerprint(request["cwd"], global_config), global_config)
+        show(context=f"Converting {len(request['pages'])} page(s) of {global_config['outdir']}")
+        for page in request["pages"]:
+            pagename = page["pagename"]
+            before = pdf_generator.stats()
+            output = io.StringIO()
+            with redirect_stdout(output):
+                try_convert_page(pdf_generator, global_config["outdir"], pagename, page["metadata"], page["html"])
+            after = pdf_generator.stats()
+            assert pdf_generator.manifest is not None, "on_config and reset load the manifest"
+            send(
+                {
+                    "pagename": pagename,
+                    "stats": {name: value - before.get(name, 0) for name, value in after.items()},
+                    "manifest_entry": pdf_generator.manifest.entries.get(pagename),
+                    "page_timing": pdf_generator.page_timings.pop(pagename, None),
+                    "output": output.getvalue(),
+                }
+            )
+        # The parsed pages and laid out documents are full of reference cycles, free them before waiting
+        gc.collect()
+        send({"done": True})
+
+    def _plugin(self, key: str, global_config: Dict[str, Any]) -> "PdfGeneratePlugin":
+        from .pdf_generate import PdfGeneratePlugin
+
+        handler_files = _handler_files(global_config)
+        cached = self._plugins.pop(key, None)
+        if cached is not None and cached[0] == handler_files:
+            pdf_generator = cached[1]
+            pdf_generator.reset()
+        else:
+            if cached is not None:
+                show(context="The theme or plugin handler changed, setting up the renderer again")
+            pdf_generator = PdfGeneratePlugin()
+            pdf_generator.on_config(global_config)
+        self._plugins[key] = (handler_files, pdf_generator)
+        while len(self._plugins) > self.max_renderers:
+            self._plugins.popitem(last=False)
+        return pdf_generator
+
+
+def _handler_files(global_config: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+    """Path, modification time and size of the custom theme and plugin handlers of a project.
+
+    They are relative to the current directory, like in Renderer._load_theme_handler.
+    """
+    handler_files = []
+    for option in ("theme_handler_path", "plugin_handler_path"):
+        if global_config.get(option):
+            path = Path.cwd().joinpath(global_config[option])
+            try:
+                stat = path.stat()
+            except OSError:
+                handler_files.append((str(path), 0, 0))
+                continue
+            handler_files.append((str(path), stat.st_mtime_ns, stat.st_size))
+    return handler_files
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        def send(message: Dict[str, Any]) -> None:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+        line = self.rfile.readline()
+        if not line:
+            # Closed without a request, e.g. to check whether the daemon is running
+            return
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                send({"error": f"invalid request: {e}"})
+                return
+            if request.get("version") != __version__:
+                # The options and manifest entries may differ between versions
+                send({"error": f"the daemon runs version {__version__}, not {request.get('version')}"})
+                return
+            cast(_RenderServer, self.server).render_daemon.convert(request, send)
+        except BrokenPipeError:
+            show(context="The CLI tool disconnected before its pages were converted", error=True)
+
+
+class _RenderServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path: Path, render_daemon: RenderDaemon):
+        self.render_daemon = render_daemon
+        # Only the user running the daemon can connect to the socket
+        umask = os.umask(0o077)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(umask)
+
+
+def _is_own_socket(socket_path: Path) -> bool:
+    """Whether the path is a socket created by the current user.
+
+    The pages, options and manifest entries are only exchanged with a daemon run by the same user, since another local
+    user could create the socket at the default path in the temporary directory first.
+    """
+    try:
+        socket_stat = socket_path.lstat()
+    except OSError:
+        return False
+    return stat.S_ISSOCK(socket_stat.st_mode) and socket_stat.st_uid == os.getuid()
+
+
+def _is_running(socket_path: Path) -> bool:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with client:
+        try:
+            client.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Keep PDF renderers loaded between runs of sphinx-pdf-generate, which hands its pages over to it.",
+    )
+    parser.add_argument("--version", action="version", version=f"sphinx-pdf-generate {__version__}")
+    parser.add_argument(
+        "--socket", type=Path, default=default_socket_path(), metavar="PATH", help="path of the Unix socket"
+    )
+    parser.add_argument(
+        "--max-renderers",
+        type=int,
+        default=MAX_RENDERERS,
+        metavar="N",
+        help="number of projects whose renderer is kept loaded",
+    )
+    return parser
+
+
+def main() -> None:
+    """Run the render daemon until it is interrupted."""
+    args = get_parser().parse_args()
+    if not hasattr(socket, "AF_UNIX"):
+        show(context="The render daemon needs Unix sockets, which this platform does not support", error=True)
+        sys.exit(1)
+    if args.socket.exists():
+        if _is_running(args.socket):
+            show(context=f"A render daemon is already running at {args.socket}", error=True)
+            sys.exit(1)
+        # Left by a daemon that did not stop cleanly
+        args.socket.unlink()
+
+    server = _RenderServer(args.socket, RenderDaemon(args.max_renderers))
+    show(context=f"Render daemon listening at {args.socket} (Ctrl+C to stop)")
+    try:
+        with server:
+            server.serve_forever()
+    except KeyboardInterrupt:
+        show(context="Stopped the render daemon")
+    finally:
+        args.socket.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Cache of the images loaded by WeasyPrint, shared by every PDF document rendered by a process."""
+
+import hashlib
+import re
+import shutil
+import tempfile
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+# WeasyPrint stores the images it loads by URL, and their data by the MD5 checksum of the URL followed by a slot name
+DATA_KEY_PATTERN = re.compile(r"^([0-9a-f]{32})-")
+
+
+class _OnDisk:
+    """Image data saved to a file of the disk store instead of being held in memory."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: Path):
+        self.path = path
+
+
+class ImageCache(Dict[str, Any]):
+    """Images loaded by WeasyPrint, passed as its ``cache`` option to every PDF document.
+
+    Images are evicted as a whole, the least recently used first, once their data takes more than ``max_size`` bytes.
+    Eviction only happens in :meth:`trim`, called once a PDF document is written, since WeasyPrint reads the image
+    data of a document from the cache while writing it. Image files are loaded again when they are modified.
+
+    WeasyPrint only accepts a ``dict`` or its own ``DiskCache`` as cache, hence the subclass of ``dict``.
+
+    :param disk_dir: Folder to save the image data into instead of memory. Each process uses its own temporary folder
+        in it, removed when the cache is garbage collected.
+    """
+
+    def __init__(self, max_size: int, disk_dir: Optional[Path] = None):
+        super().__init__()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        # Image URLs by image ID (the MD5 checksum of the URL), the least recently used first
+        self._urls: "OrderedDict[str, str]" = OrderedDict()
+        self._data_keys: Dict[str, Set[str]] = {}
+        self._sizes: Dict[str, int] = {}
+        # Modification times of the image files when they were loaded, by image ID
+        self._mtimes: Dict[str, Optional[int]] = {}
+        self._disk_dir = None
+        if disk_dir is not None:
+            disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_dir = Path(tempfile.mkdtemp(dir=disk_dir))
+            weakref.finalize(self, shutil.rmtree, self._disk_dir, True)
+
+    def __contains__(self, key: object) -> bool:
+        found = super().__contains__(key)
+        if isinstance(key, str) and DATA_KEY_PATTERN.match(key) is None:
+            image_id = self._image_id(key)
+            if found and self._mtimes.get(image_id) != _mtime_ns(key):
+                self._evict(image_id)
+                found = False
+            if found:
+                self.hits += 1
+                self._urls.move_to_end(image_id)
+            else:
+                self.misses += 1
+        return found
+
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        if isinstance(value, _OnDisk):
+            return value.path.read_bytes()
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        match = DATA_KEY_PATTERN.match(key)
+        if match is None:
+            image_id = self._image_id(key)
+            self._urls[image_id] = key
+            self._urls.move_to_end(image_id)
+            self._mtimes[image_id] = _mtime_ns(key)
+            super().__setitem__(key, value)
+            return
+
+        image_id = match.group(1)
+        if super().__contains__(key):
+            self._discard_data(image_id, key)
+        self._data_keys.setdefault(image_id, set()).add(key)
+        if isinstance(value, bytes):
+            self._sizes[image_id] = self._sizes.get(image_id, 0) + len(value)
+            self.size += len(value)
+            if self._disk_dir is not None:
+                path = self._disk_dir.joinpath(hashlib.md5(key.encode(), usedforsecurity=False).hexdigest())
+                path.write_bytes(value)
+                value = _OnDisk(path)
+        super().__setitem__(key, value)
+
+    def trim(self) -> None:
+        """Evict the least recently used images until their data takes at most ``max_size`` bytes."""
+        while self.size > self.max_size and self._urls:
+            self._evict(next(iter(self._urls)))
+
+    def _evict(self, image_id: str) -> None:
+        url = self._urls.pop(image_id)
+        super().pop(url, None)
+        for key in self._data_keys.pop(image_id, set()):
+            self._discard_data(image_id, key)
+        self._sizes.pop(image_id, None)
+        self._mtimes.pop(image_id, None)
+
+    def _discard_data(self, image_id: str, key: str) -> None:
+        value = super().pop(key)
+        if isinstance(value, _OnDisk):
+            size = value.path.stat().st_size
+            value.path.unlink()
+        else:
+            size = len(value) if isinstance(value, bytes) else 0
+        self._sizes[image_id] = self._sizes.get(image_id, 0) - size
+        self.size -= size
+
+    @staticmethod
+    def _image_id(url: str) -> str:
+        return hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+
+
+def _mtime_ns(url: str) -> Optional[int]:
+    """Modification time of the file an image URL points to, or None if it is not a local file."""
+    split_url = urlsplit(url)
+    if split_url.scheme != "file":
+        return None
+    try:
+        return Path(url2pathname(split_url.path)).stat().st_mtime_ns
+    except OSError:
+        return None
@@ -0,0 +1,169 @@
+"""Persistent record of the PDF files generated for each page, used to skip pages whose render inputs did not change."""
+
+import hashlib
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+MANIFEST_FILENAME = "pdf_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def file_digest(path: Union[str, Path]) -> str:
+    """SHA-256 checksum of a file, or an empty string if the file does not exist.
+
+    Checksums are cached for the rest of the build, since the stylesheets, templates and handlers they are computed for
+    do not change during a build. ``file_digest.cache_clear()`` forgets them before another build in the same process.
+    """
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return ""
+
+
+def fingerprint(*parts: Any) -> str:
+    """SHA-256 checksum of the given parts. Parts that are not strings are serialized to JSON first."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Fingerprints and output files of the PDF documents generated in the output directory."""
+
+    def __init__(
+        self,
+        path: Path,
+        entries: Optional[Dict[str, Dict[str, Any]]] = None,
+        links: Optional[Dict[str, Dict[str, int]]] = None,
+    ):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+        # Size and modification time of the HTML pages once their download link was written, see has_link. They are
+        # kept when the conversion of a page fails, since its HTML page is not written again.
+        self.links: Dict[str, Dict[str, int]] = links or {}
+
+    @classmethod
+    def load(cls, outdir: Union[str, Path]) -> "Manifest":
+        path = Path(outdir).joinpath(MANIFEST_FILENAME)
+        try:
+            with open(path, encoding="utf-8") as json_file:
+                data = json.load(json_file)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages"), data.get("links"))
+
+    def is_fresh(self, pagename: str, page_fingerprint: str, pdf_path: Path) -> bool:
+        """Whether the PDF of a page was generated from the same fingerprint and has not changed since."""
+        entry = self.entries.get(pagename)
+        if entry is None or entry.get("fingerprint") != page_fingerprint:
+            return False
+        if entry.get("pdf") != self._relative(pdf_path):
+            return False
+        return self._pdf_unchanged(entry)
+
+    def has_link(self, pagename: str, html_path: Path) -> bool:
+        """Whether the HTML page was not modified since its PDF download link was added to it.
+
+        A page Sphinx did not write again, or wrote again in a build run without the CLI tool, e.g. ``make html``,
+        does not have its download link.
+        """
+        link = self.links.get(pagename)
+        if link is None:
+            return False
+        try:
+            stat = Path(html_path).stat()
+        except OSError:
+            return False
+        return stat.st_size == link["size"] and stat.st_mtime_ns == link["mtime_ns"]
+
+    def is_unchanged(self, pagename: str, site_fingerprint: str, html_path: Path) -> bool:
+        """Whether a page has its download link and its PDF is up to date, without reading the page.
+
+        The HTML page has not changed since it was converted, the stylesheets it links to have not changed, and the
+        stylesheets, templates, handlers and options shared by all pages have not changed either.
+        """
+        entry = self.entries.get(pagename)
+        if entry is None or entry.get("site") != site_fingerprint:
+            return False
+        if not self.has_link(pagename, html_path) or not self._pdf_unchanged(entry):
+            return False
+        # Sphinx does not write a page again when a stylesheet it links to changes, e.g. one in html_static_path
+        stylesheets = entry.get("stylesheets")
+        if stylesheets is None:
+            return False
+        return all(file_digest(self.path.parent.joinpath(path)) == digest for path, digest in stylesheets)
+
+    def record(
+        self,
+        pagename: str,
+        page_fingerprint: str,
+        pdf_path: Path,
+        site_fingerprint: str,
+        stylesheets: List[Tuple[Path, str]],
+    ) -> None:
+        """Record the PDF file of a converted page, and the checksums of the stylesheets the page links to."""
+        stat = pdf_path.stat()
+        self.entries[pagename] = {
+            "fingerprint": page_fingerprint,
+            "site": site_fingerprint,
+            "stylesheets": [[self._relative(path), digest] for path, digest in stylesheets],
+            "pdf": self._relative(pdf_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def record_link(self, pagename: str, html_path: Path) -> None:
+        """Record the HTML page of a converted page once its download link is written, see :meth:`has_link`."""
+        if pagename not in self.entries:
+            # The conversion failed or the page has no PDF file: its HTML page was not modified
+            return
+        try:
+            stat = Path(html_path).stat()
+        except OSError:
+            return
+        self.links[pagename] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def update(self, pagename: str, entry: Optional[Dict[str, Any]]) -> None:
+        """Set the entry of a page as reported by another process, or drop it if ``entry`` is None."""
+        if entry is None:
+            self.entries.pop(pagename, None)
+        else:
+            self.entries[pagename] = entry
+
+    def prune(self, pagenames: Iterable[str]) -> None:
+        """Drop the entries of pages that are no longer part of the project."""
+        keep = set(pagenames)
+        for pagename in list(self.entries):
+            if pagename not in keep:
+                del self.entries[pagename]
+        for pagename in list(self.links):
+            if pagename not in keep:
+                del self.links[pagename]
+
+    def save(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as json_file:
+            data = {"version": MANIFEST_VERSION, "pages": self.entries, "links": self.links}
+            json.dump(data, json_file, indent=4, sort_keys=True)
+
+    def _pdf_unchanged(self, entry: Dict[str, Any]) -> bool:
+        try:
+            stat = self.path.parent.joinpath(entry["pdf"]).stat()
+        except (KeyError, OSError):
+            return False
+        return stat.st_size == entry.get("size") and stat.st_mtime_ns == entry.get("mtime_ns")
+
+    def _relative(self, path: Path) -> str:
+        try:
+            return Path(path).relative_to(self.path.parent).as_posix()
+        except ValueError:
+            return Path(path).as_posix()
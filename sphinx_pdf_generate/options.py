@@ -1,16 +1,19 @@
-import logging
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from sphinx.util.logging import SphinxLoggerAdapter
+
 from .templates.filters.url import URLFilter
 from .templates.template import Template
+from .utils import HTML_PARSERS, default_html_parser, is_html_parser_installed
 
 
 class Options:
-    def __init__(self, config: Dict[str, Any], logger: logging):
+    def __init__(self, config: Dict[str, Any], logger: SphinxLoggerAdapter):
         self.verbose: bool = config["verbose"]
         self.debug: bool = config["debug"]
         self.debug_target: Optional[str] = config["debug_target"]
+        self.profile: bool = config.get("profile", False)
         self.srcdir: Path = Path(config["srcdir"])
         self.outdir: Path = Path(config["outdir"])
         self._src_path: Optional[Path] = None
@@ -61,6 +64,23 @@ class Options:
         # for system
         self._logger = logger
 
+        # Images: resolution they are downsampled to, and WeasyPrint's image options
+        self.image_dpi: Optional[int] = config.get("image_dpi")
+        self.jpeg_quality: Optional[int] = config.get("jpeg_quality")
+        self.optimize_images: bool = config.get("optimize_images", False)
+        # Size in megabytes of the image cache shared by the PDF documents, and whether it keeps the image data on disk
+        self.image_cache_size: int = config.get("image_cache_size") or 64
+        self.image_cache_on_disk: bool = config.get("image_cache_on_disk", False)
+
+        # HTML parser used by BeautifulSoup in every stage of the conversion
+        self.html_parser: str = config.get("html_parser") or default_html_parser()
+        if not is_html_parser_installed(self.html_parser):
+            self._logger.warning(
+                f'The HTML parser "{self.html_parser}" is not available (choose from {", ".join(HTML_PARSERS)}). '
+                f'Using "{default_html_parser()}" instead.'
+            )
+            self.html_parser = default_html_parser()
+
     @property
     def body_title(self) -> str:
         return self._body_title
@@ -94,7 +114,7 @@ class Options:
         return self._cover_images
 
     @property
-    def logger(self) -> logging:
+    def logger(self) -> SphinxLoggerAdapter:
         return self._logger
 
     @property
@@ -117,6 +137,13 @@ class Options:
     def out_dest_path(self, input_path):
         self._dest_path = input_path
 
+    def cache_dir(self) -> Path:
+        """Directory in the output directory where files reused by later builds are cached."""
+        cache_folder_path = Path(self.outdir).resolve().joinpath(".pdfgen_cache")
+        if not cache_folder_path.is_dir():
+            cache_folder_path.mkdir(parents=True, exist_ok=True)
+        return cache_folder_path
+
     def debug_dir(self) -> Path:
         if self.debug:
             docs_out_dir = Path(self.outdir).parent.resolve()
@@ -0,0 +1,220 @@
+"""Sphinx builder converting each page to PDF from its doctree, without writing the HTML pages of the site."""
+
+import hashlib
+import html
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import AbstractSet, Any, Dict, Iterator, Optional, Set
+
+from docutils import nodes
+from sphinx.builders.html import StandaloneHTMLBuilder
+from sphinx.util import logging
+from sphinx.util.osutil import copyfile, ensuredir, relative_uri
+
+from .manifest import Manifest
+from .pdf_generate import (
+    PdfGeneratePlugin,
+    get_global_options,
+    toctree_order,
+)
+from .timing import write_timing_report
+from .utils import get_pdf_metadata
+
+logger = logging.getLogger(__name__)
+
+# Page holding only the content of a document, converted to PDF instead of the page rendered with the HTML theme
+PRINT_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="{language}">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" type="text/css" href="{static_path}/pygments.css">
+</head>
+<body>
+<div class="body" role="main">
+{body}
+</div>
+</body>
+</html>
+"""
+# Folder of the cache folder where the parallel writer processes leave the results of their pages
+RESULTS_DIRNAME = "builder_results"
+
+
+class PdfGenerateBuilder(StandaloneHTMLBuilder):
+    """Converts each page to PDF from its doctree.
+
+    The doctree of a page is translated to a minimal HTML page holding only its content, which is converted to PDF in
+    ``write_doc``, so no theme markup is rendered and no HTML file is written and read back. With ``sphinx-build -j``,
+    the pages are converted by Sphinx's parallel writer processes, which leave the counters and manifest entries of
+    their pages in the cache folder of the output directory for the main process.
+    """
+
+    name = "pdfgen"
+    epilog = "The PDF files are in %(outdir)s."
+    allow_parallel = True
+    search = False
+    copysource = False
+
+    def init(self) -> None:
+        super().init()
+        self.pdf_generator: Optional[PdfGeneratePlugin] = None
+        self._copied_images: Set[str] = set()
+        self._main_pid = os.getpid()
+
+    def get_outdated_docs(self) -> Iterator[str]:
+        """Pages to convert whose PDF file is missing, was modified, or is older than their source file.
+
+        Every page is converted again once the options, stylesheets, templates or handlers shared by all pages
+        changed, since Sphinx does not read the pages again when only the ``pdfgen_*`` options change.
+        """
+        pdf_generator = self._setup_pdf_generator()
+        entries = self._manifest().entries
+        site_fingerprint = pdf_generator.get_site_fingerprint()
+        for docname in self.env.found_docs:
+            if not get_pdf_metadata(self.env.metadata.get(docname)).get("build"):
+                continue
+            entry = entries.get(docname)
+            if entry is None or entry.get("site") != site_fingerprint:
+                yield docname
+                continue
+            try:
+                pdf_stat = Path(self.outdir).joinpath(entry["pdf"]).stat()
+                source_mtime = Path(self.env.doc2path(docname)).stat().st_mtime_ns
+            except OSError:
+                yield docname
+                continue
+            if pdf_stat.st_mtime_ns != entry.get("mtime_ns") or source_mtime > pdf_stat.st_mtime_ns:
+                yield docname
+
+    def prepare_writing(self, docnames: AbstractSet[str]) -> None:
+        super().prepare_writing(docnames)
+        static_dir = os.path.join(self.outdir, "_static")
+        ensuredir(static_dir)
+        with open(os.path.join(static_dir, "pygments.css"), "w", encoding="utf-8") as css_file:
+            css_file.write(self.highlighter.get_stylesheet())
+
+        self._setup_pdf_generator()
+        shutil.rmtree(self._results_dir(), ignore_errors=True)
+
+    def copy_assets(self) -> None:
+        # The images are copied in write_doc_serialized, nothing else is needed by the PDF files
+        pass
+
+    def write_doc_serialized(self, docname: str, doctree: nodes.document) -> None:
+        super().write_doc_serialized(docname, doctree)
+        # WeasyPrint reads the images while the pages are written, copy them now instead of once the build is finished
+        images_dir = os.path.join(self.outdir, self.imagedir)
+        for src, dest in self.images.items():
+            if dest not in self._copied_images:
+                ensuredir(images_dir)
+                copyfile(os.path.join(self.srcdir, src), os.path.join(images_dir, dest))
+                self._copied_images.add(dest)
+
+    def write_doc(self, docname: str, doctree: nodes.document) -> None:
+        pdf_generator = self._pdf_generator()
+        html_content = self._print_page(docname, doctree)
+        before = pdf_generator.stats()
+        try:
+            pdf_generator.convert_page_to_pdf(html_content, docname, self.env.metadata.get(docname))
+        except Exception as e:
+            logger.warning(str(pdf_generator.page_error(docname, e)), location=docname)
+        if os.getpid() == self._main_pid:
+            return
+
+        # Results of a parallel writer process are lost with it, leave them for the main process
+        after = pdf_generator.stats()
+        result = {
+            "stats": {name: value - before.get(name, 0) for name, value in after.items()},
+            "manifest_entry": self._manifest().entries.get(docname),
+            "page_timing": pdf_generator.page_timings.pop(docname, None),
+        }
+        results_dir = self._results_dir()
+        ensuredir(results_dir)
+        result_name = hashlib.md5(docname.encode(), usedforsecurity=False).hexdigest()
+        with open(results_dir.joinpath(f"{result_name}.json"), "w", encoding="utf-8") as json_file:
+            json.dump({"docname": docname, **result}, json_file)
+
+    def finish(self) -> None:
+        if self.pdf_generator is None:
+            # No page was written
+            return
+        self._merge_results()
+        pdf_generator = self._pdf_generator()
+        manifest = self._manifest()
+        manifest.prune(self.env.found_docs)
+        manifest.save()
+        if pdf_generator.page_timings:
+            write_timing_report(self.outdir, pdf_generator.page_timings)
+        if pdf_generator.combined:
+            from .combine import combine_pdfs, combined_filename
+
+            filename = combined_filename(pdf_generator.config.get("combined_filename"))
+            try:
+                combined_path = combine_pdfs(self.outdir, manifest, toctree_order(self.env), filename)
+            except ValueError as e:
+                logger.warning(str(e))
+            else:
+                if combined_path is not None:
+                    logger.info(f"combined the PDF files into {combined_path}")
+
+        logger.info(
+            f"converted {pdf_generator.pdf_num_files} file(s) to PDF in {pdf_generator.total_time:.1f}s, "
+            f"{pdf_generator.pdf_skipped_files} unchanged file(s) kept"
+        )
+        if pdf_generator.num_errors > 0:
+            logger.warning(f"{pdf_generator.num_errors} conversion error(s) occurred")
+
+    def _print_page(self, docname: str, doctree: nodes.document) -> str:
+        """Translate a doctree to a page holding only its content, with links and images relative to the page."""
+        doctree.settings = self.docsettings
+        self.secnumbers = self.env.toc_secnumbers.get(docname, {})
+        self.fignumbers = self.env.toc_fignumbers.get(docname, {})
+        self.imgpath = relative_uri(self.get_target_uri(docname), self.imagedir)
+        self.dlpath = relative_uri(self.get_target_uri(docname), "_downloads")
+        self.current_docname = docname
+        visitor = self.create_translator(doctree, self)
+        doctree.walkabout(visitor)
+
+        title = self.env.titles[docname].astext() if docname in self.env.titles else docname
+        return PRINT_PAGE_TEMPLATE.format(
+            language=html.escape(self.config.language or "en"),
+            title=html.escape(title),
+            static_path=relative_uri(self.get_target_uri(docname), "_static"),
+            body="".join(visitor.fragment),
+        )
+
+    def _merge_results(self) -> None:
+        results_dir = self._results_dir()
+        if not results_dir.is_dir():
+            return
+        for result_file in sorted(results_dir.glob("*.json")):
+            with open(result_file, encoding="utf-8") as json_file:
+                result: Dict[str, Any] = json.load(json_file)
+            self._pdf_generator().merge_page_result(result["docname"], result)
+        shutil.rmtree(results_dir, ignore_errors=True)
+
+    def _setup_pdf_generator(self) -> PdfGeneratePlugin:
+        """Set up the plugin once per build, before the outdated pages are looked up or written."""
+        if self.pdf_generator is None:
+            global_options = get_global_options(self.config)
+            # The pages are not rendered with the HTML theme, so its handler does not apply
+            global_options.update(theme_name=None, outdir=str(self.outdir), srcdir=str(self.srcdir))
+            # Set up the renderer in the main process, the parallel writer processes inherit it with the fonts loaded
+            self.pdf_generator = PdfGeneratePlugin()
+            self.pdf_generator.on_config(global_options)
+        return self.pdf_generator
+
+    def _pdf_generator(self) -> PdfGeneratePlugin:
+        assert self.pdf_generator is not None, "prepare_writing sets up the plugin before pages are written"
+        return self.pdf_generator
+
+    def _manifest(self) -> Manifest:
+        manifest = self._pdf_generator().manifest
+        assert manifest is not None, "on_config loads the manifest"
+        return manifest
+
+    def _results_dir(self) -> Path:
+        return Path(self.outdir).resolve().joinpath(".pdfgen_cache", RESULTS_DIRNAME)
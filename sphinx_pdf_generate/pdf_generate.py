@@ -1,21 +1,35 @@
 import json
 import logging
+from functools import partial
 from pathlib import Path
 from timeit import default_timer as timer
-from typing import Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
 
 from docutils import nodes
 from sphinx.application import Sphinx
-from sphinx.util import docutils
+from sphinx.config import Config
+from sphinx.environment import BuildEnvironment
 
-from sphinx_pdf_generate.build import show
+from sphinx_pdf_generate import manifest
+from sphinx_pdf_generate.build import get_build_capture, show
 from sphinx_pdf_generate.logging import get_logger
-from sphinx_pdf_generate.options import Options
-from sphinx_pdf_generate.renderer import Renderer
-from sphinx_pdf_generate.templates.filters.url import URLFilter
-from sphinx_pdf_generate.utils import get_pdf_metadata, h1_title_tag, secure_filename
+from sphinx_pdf_generate.manifest import Manifest
+from sphinx_pdf_generate.profiling import get_profile_path, profile_call
+from sphinx_pdf_generate.templates.filters.url import URLFilter, clear_path_resolvers
+from sphinx_pdf_generate.timing import StageTimer
+from sphinx_pdf_generate.utils import (
+    get_pdf_metadata,
+    h1_title_tag,
+    parse_html,
+    secure_filename,
+)
 from sphinx_pdf_generate.version import __version__
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+    from sphinx_pdf_generate.pipeline import FileWriter
+
 
 def setup(app: Sphinx) -> Dict[str, Any]:
     ########################################################################
@@ -42,6 +56,23 @@ def setup(app: Sphinx) -> Dict[str, Any]:
     app.add_config_value("pdfgen_toc_title", "Table of Contents", "html", types=[str])
     app.add_config_value("pdfgen_toc_level", 4, "html", types=[int])
     app.add_config_value("pdfgen_cover_images", None, "html", types=[dict])
+    app.add_config_value("pdfgen_html_parser", None, "html", types=[str])
+    app.add_config_value("pdfgen_profile", False, "html", types=[bool])
+    app.add_config_value("pdfgen_combined", False, "html", types=[bool])
+    app.add_config_value("pdfgen_image_dpi", None, "html", types=[int])
+    app.add_config_value("pdfgen_jpeg_quality", None, "html", types=[int])
+    app.add_config_value("pdfgen_optimize_images", False, "html", types=[bool])
+    app.add_config_value("pdfgen_image_cache_size", 64, "html", types=[int])
+    app.add_config_value("pdfgen_image_cache_on_disk", False, "html", types=[bool])
+    app.add_config_value("pdfgen_combined_filename", None, "html", types=[str])
+
+    ########################################################################
+    # BUILDERS
+    ########################################################################
+    # Imported here, the builder module depends on this one
+    from sphinx_pdf_generate.pdf_builder import PdfGenerateBuilder
+
+    app.add_builder(PdfGenerateBuilder)
 
     ######################################################################
     # ROLES
@@ -52,7 +83,11 @@ def setup(app: Sphinx) -> Dict[str, Any]:
     ########################################################################
     # Make connections to events
     app.connect("builder-inited", builder_inited)
-    app.connect("html-page-context", generate_sources_to_convert)
+    # After Sphinx's own collector has read the page's metadata
+    app.connect("doctree-read", collect_page_metadata, priority=600)
+    app.connect("env-purge-doc", purge_page_metadata)
+    app.connect("env-merge-info", merge_page_metadata)
+    app.connect("doctree-resolved", record_written_page)
     app.connect("build-finished", build_finished)
 
     return {
@@ -65,15 +100,42 @@ def setup(app: Sphinx) -> Dict[str, Any]:
 # ----- SPHINX-EVENTS FUNCTIONS ----- #
 def builder_inited(app: Sphinx) -> None:
     if not hasattr(app.env, "sphinx_pdfgen_data"):
-        # Used to store the data about of HTML files that needs to be converted.
+        # Metadata of the pages to convert, collected when a page is read and kept across builds with the environment
         app.env.sphinx_pdfgen_data = {}
+    # Pages written by the current build. Unlike the page data above, this is not kept across builds.
+    app.env.sphinx_pdfgen_written = set()
+
+    build_capture = get_build_capture()
+    if build_capture is not None and app.builder.format == "html" and hasattr(app.builder, "templates"):
+        # Sphinx runs inside the CLI: hand the rendered pages over in memory.
+        build_capture.capture_templates(app.builder.templates)
+
+
+def collect_page_metadata(app: Sphinx, doctree: nodes.document) -> None:
+    docname = app.env.docname
+    project_metadata: Dict[str, str] = app.env.metadata.get(docname)  # Get metadata of a page
+    app.env.sphinx_pdfgen_data[docname] = project_metadata
 
 
-def generate_sources_to_convert(
-    app: Sphinx, pagename: str, templatename: str, context: Dict, doctree: docutils.nodes.Node
-):
-    project_metadata: Dict[str, str] = app.env.metadata.get(pagename)  # Get metadata of a page
-    app.env.sphinx_pdfgen_data.update([(pagename, project_metadata)])
+def purge_page_metadata(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Forget a page that is read again or was removed from the project."""
+    env.sphinx_pdfgen_data.pop(docname, None)
+
+
+def merge_page_metadata(app: Sphinx, env: BuildEnvironment, docnames: Set[str], other: BuildEnvironment) -> None:
+    """Add the metadata of the pages read by a parallel process of ``sphinx-build -j``."""
+    for docname in docnames:
+        if docname in other.sphinx_pdfgen_data:
+            env.sphinx_pdfgen_data[docname] = other.sphinx_pdfgen_data[docname]
+
+
+def record_written_page(app: Sphinx, doctree: nodes.document, docname: str) -> None:
+    """Record a page the builder is about to (re)write.
+
+    Sphinx resolves the doctree of each page it writes in the main process, even when the pages are written by
+    parallel processes, where data stored from the ``html-page-context`` event would be lost.
+    """
+    app.env.sphinx_pdfgen_written.add(docname)
 
 
 def page_break_role(name, rawtext, text, lineno, inliner, options={}, content=[]):  # noqa B006
@@ -81,68 +143,146 @@ def page_break_role(name, rawtext, text, lineno, inliner, options={}, content=[]
     return [nodes.raw("", '<p class="page-break" style="margin: 0"></p>', format="html")], []
 
 
-def build_finished(app: Sphinx, exception: Exception):
+def get_global_options(config: Config) -> Dict[str, Any]:
+    """Options shared by every page, from the project's configuration."""
     global_options = {}
     global_options.update(
-        verbose=app.config.pdfgen_verbose,
-        site_url=app.config.pdfgen_site_url,
-        debug=app.config.pdfgen_debug,
-        debug_target=None if len(app.config.pdfgen_debug_target) == 0 else app.config.pdfgen_debug_target,
-        author=app.config.author if not app.config.pdfgen_author else app.config.pdfgen_author,
-        author_logo=app.config.html_logo if not app.config.pdfgen_author_logo else app.config.pdfgen_author_logo,
-        copyright=app.config.copyright if not app.config.pdfgen_copyright else app.config.pdfgen_copyright,
-        disclaimer=app.config.pdfgen_disclaimer,
-        cover=app.config.pdfgen_cover,
-        cover_title=app.config.pdfgen_cover_title if app.config.pdfgen_cover_title else app.config.project,
-        cover_subtitle=app.config.pdfgen_cover_subtitle,
-        custom_template_path=app.config.pdfgen_custom_template_path,
-        theme_handler_path=app.config.pdfgen_theme_handler_path,
-        plugin_handler_path=app.config.pdfgen_plugin_handler_path,
-        custom_css_path=app.config.pdfgen_custom_css_path,
-        toc=app.config.pdfgen_toc,
-        toc_numbering=app.config.pdfgen_toc_numbering,
-        toc_title=app.config.pdfgen_toc_title,
-        toc_level=app.config.pdfgen_toc_level,
-        cover_images=app.config.pdfgen_cover_images,
-        theme_name=app.config.html_theme,
-        templates_path=app.config.templates_path,
+        verbose=config.pdfgen_verbose,
+        site_url=config.pdfgen_site_url,
+        debug=config.pdfgen_debug,
+        debug_target=None if len(config.pdfgen_debug_target) == 0 else config.pdfgen_debug_target,
+        author=config.author if not config.pdfgen_author else config.pdfgen_author,
+        author_logo=config.html_logo if not config.pdfgen_author_logo else config.pdfgen_author_logo,
+        copyright=config.copyright if not config.pdfgen_copyright else config.pdfgen_copyright,
+        disclaimer=config.pdfgen_disclaimer,
+        cover=config.pdfgen_cover,
+        cover_title=config.pdfgen_cover_title if config.pdfgen_cover_title else config.project,
+        cover_subtitle=config.pdfgen_cover_subtitle,
+        custom_template_path=config.pdfgen_custom_template_path,
+        theme_handler_path=config.pdfgen_theme_handler_path,
+        plugin_handler_path=config.pdfgen_plugin_handler_path,
+        custom_css_path=config.pdfgen_custom_css_path,
+        toc=config.pdfgen_toc,
+        toc_numbering=config.pdfgen_toc_numbering,
+        toc_title=config.pdfgen_toc_title,
+        toc_level=config.pdfgen_toc_level,
+        cover_images=config.pdfgen_cover_images,
+        theme_name=config.html_theme,
+        templates_path=config.templates_path,
+        html_parser=config.pdfgen_html_parser,
+        profile=config.pdfgen_profile,
+        combined=config.pdfgen_combined,
+        # The PDF document of the root page is named after its title, which is often the project name
+        combined_filename=config.pdfgen_combined_filename or f"{config.project}-combined",
+        image_dpi=config.pdfgen_image_dpi,
+        jpeg_quality=config.pdfgen_jpeg_quality,
+        optimize_images=config.pdfgen_optimize_images,
+        image_cache_size=config.pdfgen_image_cache_size,
+        image_cache_on_disk=config.pdfgen_image_cache_on_disk,
     )
+    return global_options
+
 
-    local_options = app.env.sphinx_pdfgen_data
-    if "genindex" in local_options:
-        local_options["genindex"] = {"pdf-build": "False"}
-    if "search" in local_options:
-        local_options["search"] = {"pdf-build": "False"}
-    pdf_metadata = {"GLOBAL_OPTIONS": global_options, "LOCAL_OPTIONS": local_options}
+def build_finished(app: Sphinx, exception: Exception):
+    if app.builder.name == "pdfgen":
+        # The pdfgen builder converts the pages itself
+        return
+    global_options = get_global_options(app.config)
+
+    # Pages read before the extension was enabled have no data collected yet, take their metadata from the environment
+    local_options = {
+        docname: app.env.sphinx_pdfgen_data.get(docname, app.env.metadata.get(docname))
+        for docname in sorted(app.env.all_docs)
+    }
+    updated_pages = sorted(getattr(app.env, "sphinx_pdfgen_written", ()))
+    pdf_metadata = {
+        "GLOBAL_OPTIONS": global_options,
+        "LOCAL_OPTIONS": local_options,
+        "UPDATED_PAGES": updated_pages,
+        "TOCTREE": toctree_order(app.env),
+    }
+
+    build_capture = get_build_capture()
+    if build_capture is not None:
+        build_capture.metadata = pdf_metadata
 
     path_to_save_metadata = Path(app.outdir).joinpath("pdf_metadata.json")
     with open(path_to_save_metadata, "w") as json_file:
         json.dump(pdf_metadata, json_file, indent=4)
 
 
+def toctree_order(env: BuildEnvironment) -> List[Dict[str, Any]]:
+    """Pages included by the toctrees, depth-first from the root document, with their title and nesting level."""
+    pages = []
+    seen = set()
+
+    def visit(docname: str, level: int) -> None:
+        if docname in seen or docname not in env.all_docs:
+            return
+        seen.add(docname)
+        title = env.titles[docname].astext() if docname in env.titles else docname
+        pages.append({"docname": docname, "title": title, "level": level})
+        for included in env.toctree_includes.get(docname, []):
+            visit(included, level + 1)
+
+    visit(env.config.root_doc, 0)
+    return pages
+
+
+# Global options that do not change the PDF files, so they are left out of the page fingerprints
+UNFINGERPRINTED_OPTIONS = ("profile", "combined", "combined_filename")
+
+
 # ----- PDF-GENERATE-PLUGIN CLASS ----- #
 class PdfGeneratePlugin:
-    def __init__(self):
+    def __init__(self) -> None:
         self._options = None
         self._config = None
         self._logger = get_logger("sphinx-pdf-generate")
         self._logger.setLevel(logging.INFO)
         self.renderer = None
+        self.manifest: Optional[Manifest] = None
+        # Writes the PDF files in a background thread when set, see pipeline.convert_pages_pipelined
+        self.file_writer: Optional["FileWriter"] = None
+        self._site_fingerprint = None
         self.generate_txt = None
         self.combined = False
         self.pdf_num_files = 0
+        self.pdf_skipped_files = 0
         self.txt_num_files = 0
         self.num_errors = 0
         self.total_time = 0
-
-    def on_config(self, config):
+        self.font_setup_time = 0
+        self.font_setup_saved = 0
+        self._font_setup_per_page = None
+        # Links to other pages found in the cache of rewritten links, or rewritten
+        self.link_cache_hits = 0
+        self.link_cache_misses = 0
+        # Images found in the image cache shared by the PDF documents, or loaded
+        self.image_cache_hits = 0
+        self.image_cache_misses = 0
+        # Peak memory usage of the worker processes in megabytes, and how many times they were replaced
+        self.peak_worker_rss = 0
+        self.worker_recycles = 0
+        # Time spent in each stage of the pages converted by this plugin instance
+        self.page_timings: Dict[str, Dict[str, Any]] = {}
+
+    def on_config(self, config: Dict[str, Any]) -> None:
         self._config = config
+        self.combined = self._config.get("combined", False)
 
         if self._config.get("debug"):
             self._logger.info("PDF debug option is enabled.")
         if self._config.get("debug_target"):
             self._logger.info("Debug Target File: {}".format(self._config.get("debug_target")))
 
+        # Files are looked up in the output and source directories as they are after this build
+        clear_path_resolvers()
+        # WeasyPrint and the page preprocessors are imported once pages are converted, not when Sphinx loads the
+        # extension
+        from sphinx_pdf_generate.options import Options
+        from sphinx_pdf_generate.renderer import Renderer
+
         self._options = Options(self._config, self._logger)
 
         from weasyprint.logger import LOGGER
@@ -153,14 +293,85 @@ class PdfGeneratePlugin:
         else:
             LOGGER.setLevel(logging.ERROR)
 
-        handler = logging.StreamHandler()
-        handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
-        LOGGER.addHandler(handler)
+        if not any(getattr(handler, "_pdfgen", False) for handler in LOGGER.handlers):
+            # A process setting up several plugins, e.g. the render daemon, logs each WeasyPrint message once
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+            handler._pdfgen = True
+            LOGGER.addHandler(handler)
 
         self.renderer = Renderer(options=self._options, config=self._config)
+        self.manifest = Manifest.load(self._config["outdir"])
         return
 
-    def convert_page_to_pdf(self, html_content: str, pagename: str, page_metadata: Dict[str, str]):
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self._config
+
+    def reset(self) -> None:
+        """Prepare a configured plugin for another build of the same project, e.g. in watch mode.
+
+        The renderer is kept with its fonts, stylesheets, handlers and templates loaded. The counters are reset, and
+        the files, checksums and links looked up so far are forgotten, since the build may have changed them.
+        """
+        for name in self.stats():
+            setattr(self, name, 0)
+        self.page_timings = {}
+        self._site_fingerprint = None
+        manifest.file_digest.cache_clear()
+        clear_path_resolvers()
+        from sphinx_pdf_generate.preprocessor import clear_link_cache
+
+        clear_link_cache()
+        self.manifest = Manifest.load(self._config["outdir"])
+
+    def stats(self) -> Dict[str, float]:
+        """Counters describing the conversions done by this plugin instance."""
+        return {
+            "pdf_num_files": self.pdf_num_files,
+            "pdf_skipped_files": self.pdf_skipped_files,
+            "num_errors": self.num_errors,
+            "total_time": self.total_time,
+            "font_setup_time": self.font_setup_time,
+            "font_setup_saved": self.font_setup_saved,
+            "link_cache_hits": self.link_cache_hits,
+            "link_cache_misses": self.link_cache_misses,
+            "image_cache_hits": self.image_cache_hits,
+            "image_cache_misses": self.image_cache_misses,
+        }
+
+    def merge_stats(self, stats: Dict[str, float]) -> None:
+        """Add the counters of another plugin instance (e.g. one running in a worker process) to this one."""
+        for name, value in stats.items():
+            setattr(self, name, getattr(self, name, 0) + value)
+
+    def merge_page_result(self, pagename: str, result: Dict[str, Any]) -> None:
+        """Add the counters, manifest entry and stage timings of a page converted by another plugin instance."""
+        self.merge_stats(result["stats"])
+        self.manifest.update(pagename, result["manifest_entry"])
+        if result["page_timing"] is not None:
+            self.page_timings[pagename] = result["page_timing"]
+
+    def page_error(self, pagename: str, error: Exception) -> "PDFGenerateException":
+        """The error to report for a page whose conversion failed with ``error``, once it is counted.
+
+        Errors raised by ``convert_page_to_pdf`` are counted already. Others, e.g. failing to read the HTML page, are
+        counted here, and the manifest entry of the page is dropped so that the next build converts it again.
+        """
+        if isinstance(error, PDFGenerateException):
+            return error
+        self.num_errors += 1
+        if self.manifest is not None:
+            self.manifest.update(pagename, None)
+        return PDFGenerateException(f"Error converting {pagename}. Reason: {error}")
+
+    def convert_page_to_pdf(self, html_content: str, pagename: str, page_metadata: Optional[Dict[str, Any]]):
+        if self._options.profile:
+            profile_path = get_profile_path(self._config["outdir"], pagename)
+            return profile_call(profile_path, self._convert_page_to_pdf, html_content, pagename, page_metadata)
+        return self._convert_page_to_pdf(html_content, pagename, page_metadata)
+
+    def _convert_page_to_pdf(self, html_content: str, pagename: str, page_metadata: Optional[Dict[str, Any]]):
         start = timer()
 
         abs_dest_path = Path(self._config["outdir"]).joinpath(f"{pagename}.html")
@@ -187,8 +398,20 @@ class PdfGeneratePlugin:
             else:
                 build_pdf_document = False
 
-        if build_pdf_document and Path(self._config["srcdir"]).joinpath(src_path).exists():
-            self._options.body_title = h1_title_tag(html_content, pdf_meta.get("title"))
+        # Pages Sphinx did not write again already have their download link
+        has_link = self.manifest.has_link(pagename, abs_dest_path)
+        build_pdf_document = build_pdf_document and Path(self._config["srcdir"]).joinpath(src_path).exists()
+        if build_pdf_document and self._is_unchanged(pagename, abs_dest_path):
+            show(context=f"Unchanged: the PDF file of {src_path} is up to date")
+            self.pdf_skipped_files += 1
+        elif build_pdf_document:
+            stage_timer = StageTimer()
+            page_timing = {"converted": False, "stages": stage_timer.stages}
+            self.page_timings[pagename] = page_timing
+            with stage_timer.stage("parse"):
+                soup = parse_html(html_content, self._options.html_parser)
+            with stage_timer.stage("title"):
+                self._options.body_title = h1_title_tag(soup, pdf_meta.get("title"))
 
             file_name = pdf_meta.get("filename") or pdf_meta.get("title") or self._options.body_title or None
             if file_name is None:
@@ -203,28 +426,148 @@ class PdfGeneratePlugin:
             file_name = secure_filename(file_name)
             base_url = dest_path.joinpath(file_name).as_uri()
             pdf_file = file_name + ".pdf"
-
-            try:
-                show(context=f"Converting {src_path} to {pdf_file}")
-                self.renderer.write_pdf(
-                    html_content,
-                    base_url,
-                    dest_path.joinpath(pdf_file),
-                    pdf_metadata=pdf_meta,
-                )
-
-                html_content = self.renderer.add_link(html_content, pdf_file)
-                self.pdf_num_files += 1
-            except Exception as e:
-                self.num_errors += 1
-                raise PDFGenerateException(f"Error converting {src_path}. Reason: {e}")
+            pdf_path = dest_path.joinpath(pdf_file)
+
+            with stage_timer.stage("fingerprint"):
+                stylesheets = self._linked_stylesheets(soup, dest_path)
+                page_fingerprint = self._page_fingerprint(soup, pdf_meta, stylesheets)
+            is_fresh = self.manifest.is_fresh(pagename, page_fingerprint, pdf_path)
+            if not self._options.debug and not self._options.profile and is_fresh:
+                show(context=f"Unchanged: {pdf_file} is up to date with {src_path}")
+                self.pdf_skipped_files += 1
+                if not has_link:
+                    with stage_timer.stage("modify_html"):
+                        html_content = self.renderer.add_link(html_content, pdf_file)
+            else:
+                try:
+                    show(context=f"Converting {src_path} to {pdf_file}")
+                    self._warm_up_renderer(stage_timer)
+                    from sphinx_pdf_generate.preprocessor import link_cache_info
+
+                    link_cache = link_cache_info()
+                    image_cache = self.renderer.image_cache
+                    image_cache_hits, image_cache_misses = image_cache.hits, image_cache.misses
+                    # The renderer is the last stage using the parsed page, so it works on it in place.
+                    pdf_data = self.renderer.write_pdf(
+                        soup,
+                        base_url,
+                        pdf_path if self.file_writer is None else None,
+                        pdf_metadata=pdf_meta,
+                        stage_timer=stage_timer,
+                    )
+                    self.link_cache_hits += link_cache_info().hits - link_cache.hits
+                    self.link_cache_misses += link_cache_info().misses - link_cache.misses
+                    self.image_cache_hits += image_cache.hits - image_cache_hits
+                    self.image_cache_misses += image_cache.misses - image_cache_misses
+
+                    if not has_link:
+                        with stage_timer.stage("modify_html"):
+                            html_content = self.renderer.add_link(html_content, pdf_file)
+                    site_fingerprint = self.get_site_fingerprint()
+                    record = partial(
+                        self._record_pdf_file, pagename, page_fingerprint, pdf_path, site_fingerprint, stylesheets
+                    )
+                    if self.file_writer is None:
+                        record()
+                    else:
+                        # The PDF file is recorded and counted once it is written, see pipeline.FileWriter
+                        self.file_writer.write(pagename, pdf_path, pdf_data, record)
+                    page_timing["converted"] = True
+                except Exception as e:
+                    self.num_errors += 1
+                    self.manifest.update(pagename, None)
+                    page_timing["total"] = timer() - start
+                    raise PDFGenerateException(f"Error converting {src_path}. Reason: {e}")
         else:
+            if not self._options.debug:
+                self.manifest.update(pagename, None)
             show(context=f"Skipped: PDF conversion for {src_path}")
 
         end = timer()
         self.total_time += end - start
+        if pagename in self.page_timings:
+            self.page_timings[pagename]["total"] = end - start
         return html_content
 
+    def _record_pdf_file(
+        self,
+        pagename: str,
+        page_fingerprint: str,
+        pdf_path: Path,
+        site_fingerprint: str,
+        stylesheets: List[Tuple[Path, str]],
+    ) -> None:
+        self.manifest.record(pagename, page_fingerprint, pdf_path, site_fingerprint, stylesheets)
+        self.pdf_num_files += 1
+
+    def _warm_up_renderer(self, stage_timer: StageTimer) -> None:
+        """Load the fonts once before the first page is rendered and count the time saved on every page."""
+        if self._font_setup_per_page is None:
+            with stage_timer.stage("font_setup"):
+                first_time, warm_time = self.renderer.warm_up()
+            self.font_setup_time += first_time + warm_time
+            self._font_setup_per_page = max(first_time - warm_time, 0)
+        self.font_setup_saved += self._font_setup_per_page
+
+    def _is_unchanged(self, pagename: str, html_path: Path) -> bool:
+        """Whether the PDF file of a page is up to date, known without reading the page. See Manifest.is_unchanged."""
+        if self._options.debug or self._options.profile:
+            return False
+        return self.manifest.is_unchanged(pagename, self.get_site_fingerprint(), html_path)
+
+    def _linked_stylesheets(self, soup: "BeautifulSoup", dest_path: Path) -> List[Tuple[Path, str]]:
+        """Paths and checksums of the stylesheets a page links to, e.g. the theme's and ``html_css_files``.
+
+        They are recorded in the manifest, so that a page Sphinx did not write again is converted again when one of
+        them changes.
+        """
+        stylesheets = []
+        for link in soup.head.find_all("link", rel="stylesheet", href=True) if soup.head else []:
+            href = str(link["href"]).split("?")[0].split("#")[0]
+            path = dest_path.joinpath(href).resolve()
+            stylesheets.append((path, manifest.file_digest(path)))
+        return stylesheets
+
+    def _page_fingerprint(
+        self, soup: "BeautifulSoup", pdf_meta: Dict[str, Any], stylesheets: List[Tuple[Path, str]]
+    ) -> str:
+        """Fingerprint of everything the PDF of a page is rendered from.
+
+        Only the main content of the page is used, so that changes to the navigation or sidebars, e.g. when a page is
+        added to the toctree, do not invalidate the PDF of every page.
+        """
+        from sphinx_pdf_generate.preprocessor import find_content
+
+        return manifest.fingerprint(
+            self.get_site_fingerprint(),
+            pdf_meta,
+            [digest for _, digest in stylesheets],
+            str(find_content(soup)),
+        )
+
+    def get_site_fingerprint(self) -> str:
+        """Fingerprint of the render inputs shared by all pages: options, stylesheets, handlers and templates."""
+        if self._site_fingerprint is None:
+            styles_dir = Path(__file__).parent.joinpath("styles")
+            files = sorted(styles_dir.glob("*.css"))
+            files.extend(self._options.template.template_files())
+            for handler in (self.renderer.theme, self.renderer.user_plugin):
+                if getattr(handler, "__file__", None):
+                    files.append(Path(handler.__file__))
+            from sphinx_pdf_generate.styles import get_custom_css_file
+
+            custom_css_file = get_custom_css_file(self._options)
+            if custom_css_file is not None:
+                files.append(custom_css_file)
+
+            self._site_fingerprint = manifest.fingerprint(
+                __version__,
+                {key: value for key, value in self._config.items() if key not in UNFINGERPRINTED_OPTIONS},
+                self.renderer.theme.get_stylesheet(),
+                [(str(path), manifest.file_digest(path)) for path in files],
+            )
+        return self._site_fingerprint
+
 
 class PDFGenerateException(Exception):
     pass
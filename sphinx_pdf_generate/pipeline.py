@@ -0,0 +1,167 @@
+"""Convert pages in the current process, reading and writing files in background threads while pages are rendered."""
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .build import show
+from .pdf_generate import PdfGeneratePlugin
+
+# Pages read ahead of the page being rendered, and files waiting to be written, before the other stages wait
+PIPELINE_DEPTH = 4
+# Seconds a background thread waits on a full queue before checking whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+_DONE = object()
+
+
+class FileWriter:
+    """Writes files in a background thread, in the order they are handed to it.
+
+    At most ``depth`` files wait to be written. Handing over more files blocks until the thread caught up, so the
+    memory held by files waiting to be written stays bounded. A file that could not be written does not stop the
+    next ones, but the next files of the same page are not written, e.g. an HTML page linking to a PDF file that was
+    not written.
+    """
+
+    def __init__(self, depth: int = PIPELINE_DEPTH):
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+        # Page name, path and error of each file that could not be written
+        self._errors: List[Tuple[str, Path, Exception]] = []
+        self._failed_pages: Set[str] = set()
+        self._thread = threading.Thread(target=self._run, name="sphinx-pdf-generate-writer", daemon=True)
+        self._thread.start()
+
+    def write(
+        self, pagename: str, path: Path, data: Union[str, bytes], on_written: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Write ``data`` to ``path``, text as UTF-8, then call ``on_written`` from the writer thread.
+
+        :param pagename: Page the file belongs to, whose next files are not written if this one could not be.
+        """
+        self._queue.put((pagename, path, data, on_written))
+
+    def close(self) -> List[Tuple[str, Path, Exception]]:
+        """Wait until every file is written.
+
+        :return: The page name, path and error of each file that could not be written.
+        """
+        self._queue.put(_DONE)
+        self._thread.join()
+        return self._errors
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            pagename, path, data, on_written = item
+            if pagename in self._failed_pages:
+                continue
+            try:
+                if isinstance(data, str):
+                    path.write_text(data, encoding="utf-8")
+                else:
+                    path.write_bytes(data)
+                if on_written is not None:
+                    on_written()
+            except Exception as e:
+                self._errors.append((pagename, path, e))
+                self._failed_pages.add(pagename)
+
+
+class PageReader:
+    """Reads the HTML pages in a background thread, at most ``depth`` pages ahead of the page being converted.
+
+    Iterating yields the page name, page metadata and HTML content of each page, in the order of ``pages``. The
+    content of a page that could not be read is the error reading it.
+    """
+
+    def __init__(
+        self,
+        outdir: str,
+        pages: Dict[str, Dict[str, Any]],
+        html_pages: Optional[Dict[str, str]] = None,
+        depth: int = PIPELINE_DEPTH,
+    ):
+        self._outdir = Path(outdir)
+        self._pages = pages
+        self._html_pages = {} if html_pages is None else html_pages
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=depth)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sphinx-pdf-generate-reader", daemon=True)
+        self._thread.start()
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any], Union[str, OSError]]]:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+    def close(self) -> None:
+        """Stop reading pages, e.g. because the conversion was interrupted."""
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        for pagename, page_metadata in self._pages.items():
+            html_content: Union[str, OSError, None] = self._html_pages.pop(pagename, None)
+            if html_content is None:
+                try:
+                    html_content = self._outdir.joinpath(f"{pagename}.html").read_text(encoding="utf-8")
+                except OSError as e:
+                    html_content = e
+            if not self._put((pagename, page_metadata, html_content)):
+                return
+        self._put(_DONE)
+
+    def _put(self, item: Any) -> bool:
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+
+def convert_pages_pipelined(
+    pdf_generator: PdfGeneratePlugin,
+    outdir: str,
+    pages: Dict[str, Dict[str, Any]],
+    html_pages: Optional[Dict[str, str]] = None,
+    depth: int = PIPELINE_DEPTH,
+) -> None:
+    """Convert ``pages`` to PDF in the current process, overlapping the file reads and writes with the rendering.
+
+    A reader thread reads the HTML pages ahead of the page being rendered, and a writer thread writes the PDF files
+    and the HTML pages with their download link. Both are bounded by ``depth`` pages, so a slow disk makes the
+    rendering wait instead of piling up pages in memory.
+
+    :param pdf_generator: Plugin instance set up with ``on_config``.
+    :param html_pages: Mapping of page names to HTML content already in memory. Pages missing from it are read from
+        ``outdir``.
+    """
+    reader = PageReader(outdir, pages, html_pages, depth)
+    writer = FileWriter(depth)
+    pdf_generator.file_writer = writer
+    try:
+        for pagename, page_metadata, html_content in reader:
+            # Go on with the next page after an error, like try_convert_page
+            try:
+                if isinstance(html_content, OSError):
+                    raise html_content
+                new_html_page_content = pdf_generator.convert_page_to_pdf(
+                    html_content=html_content, pagename=pagename, page_metadata=page_metadata
+                )
+                if new_html_page_content != html_content:
+                    writer.write(pagename, Path(outdir).joinpath(f"{pagename}.html"), new_html_page_content)
+            except Exception as e:
+                show(context=str(pdf_generator.page_error(pagename, e)), error=True)
+    finally:
+        pdf_generator.file_writer = None
+        reader.close()
+        # The manifest entry of a page is recorded once its PDF file is written, so the page is converted again
+        for pagename, path, error in writer.close():
+            show(context=f"{pdf_generator.page_error(pagename, error)} (writing {path})", error=True)
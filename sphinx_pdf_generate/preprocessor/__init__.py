@@ -1 +1,3 @@
-from .prep import get_content, get_separate  # noqa: F401
+from .images import ImageTranscoder  # noqa: F401
+from .links import clear_link_cache, link_cache_info  # noqa: F401
+from .prep import find_content, get_content, get_separate  # noqa: F401
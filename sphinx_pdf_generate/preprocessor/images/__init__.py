@@ -0,0 +1 @@
+from .transcode import ImageTranscoder  # noqa: F401
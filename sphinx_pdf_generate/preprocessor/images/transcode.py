@@ -0,0 +1,128 @@
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from bs4 import BeautifulSoup, Tag
+from PIL import Image, ImageOps
+
+# Widest area of a page that images are printed on: A4 landscape minus the page margins of _paging.css, in inches
+PRINT_WIDTH_INCHES = 277 / 25.4
+CSS_PIXELS_PER_INCH = 96
+# Raster formats that are downsampled, with the file extension of their transcoded copy
+RASTER_FORMATS = {"JPEG": ".jpg", "PNG": ".png"}
+DEFAULT_JPEG_QUALITY = 85
+EXIF_ORIENTATION = 0x0112
+# EXIF orientations that rotate an image by 90 degrees
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+WIDTH_STYLE_PATTERN = re.compile(r"(?:^|;)\s*width\s*:\s*([\d.]+)px", re.IGNORECASE)
+WIDTH_ATTRIBUTE_PATTERN = re.compile(r"^\s*([\d.]+)\s*(?:px)?\s*$", re.IGNORECASE)
+
+
+class ImageTranscoder:
+    """Downsamples the raster images of pages to the resolution they are printed at, and recompresses them.
+
+    The transcoded images are saved in ``cache_dir``, named after the SHA-256 checksum of the original image and the
+    size they are downsampled to, so they are reused by every page showing the same image and by later builds.
+    """
+
+    def __init__(self, cache_dir: Path, dpi: int, jpeg_quality: Optional[int] = None):
+        self.cache_dir = Path(cache_dir).resolve()
+        self.dpi = dpi
+        self.jpeg_quality = jpeg_quality or DEFAULT_JPEG_QUALITY
+        # Checksums of the images, by path, modification time and size
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        # Transcoded images by original image, modification time, size and width, or None to keep the original
+        self._transcoded: Dict[Tuple[str, int, int, int], Optional[str]] = {}
+
+    def transcode_images(self, soup: BeautifulSoup) -> BeautifulSoup:
+        """Point the images of a page to their transcoded copy. The image URLs must be absolute already."""
+        for img in soup.find_all("img", src=True):
+            src = self.transcode(str(img["src"]), self._max_width(img))
+            if src is not None:
+                img["src"] = src
+        return soup
+
+    def transcode(self, src: str, max_width: int) -> Optional[str]:
+        """URL of a copy of the ``file://`` image ``src`` at most ``max_width`` pixels wide.
+
+        :return: The URL of the transcoded image, or None if the image is used as it is.
+        """
+        url = urlparse(src)
+        if url.scheme != "file":
+            return None
+        path = url2pathname(url.path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size, max_width)
+        if key not in self._transcoded:
+            try:
+                self._transcoded[key] = self._transcode(path, key[:3], max_width)
+            except (OSError, ValueError, Image.DecompressionBombError):
+                # Let WeasyPrint report images it cannot read either
+                self._transcoded[key] = None
+        return self._transcoded[key]
+
+    def _max_width(self, img: Tag) -> int:
+        inches = PRINT_WIDTH_INCHES
+        style, width = str(img.get("style", "")), str(img.get("width", ""))
+        match = WIDTH_STYLE_PATTERN.search(style) or WIDTH_ATTRIBUTE_PATTERN.match(width)
+        if match is not None:
+            inches = min(float(match.group(1)) / CSS_PIXELS_PER_INCH, inches)
+        return max(round(inches * self.dpi), 1)
+
+    def _transcode(self, path: str, file_key: Tuple[str, int, int], max_width: int) -> Optional[str]:
+        with Image.open(path) as image:
+            if image.format not in RASTER_FORMATS or getattr(image, "is_animated", False):
+                return None
+            # The width the image is shown with, read from its header without decoding it
+            orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+            width = image.height if orientation in ROTATED_ORIENTATIONS else image.width
+            if width <= max_width:
+                return None
+
+            image_format = image.format
+            quality = f"-q{self.jpeg_quality}" if image_format == "JPEG" else ""
+            name = f"{self._digest(path, file_key)}-{max_width}w{quality}{RASTER_FORMATS[image_format]}"
+            transcoded_path = self.cache_dir.joinpath(name)
+            if not transcoded_path.is_file():
+                icc_profile = image.info.get("icc_profile")
+                # The copy has no EXIF orientation, rotate the image instead
+                upright: Image.Image = ImageOps.exif_transpose(image)
+                if upright.mode in ("1", "P"):
+                    upright = upright.convert("RGBA")
+                height = max(round(upright.height * max_width / upright.width), 1)
+                resized = upright.resize((max_width, height), Image.Resampling.LANCZOS)
+                self._save(resized, image_format, icc_profile, transcoded_path)
+        return transcoded_path.as_uri()
+
+    def _save(self, image: Image.Image, image_format: str, icc_profile: Optional[bytes], path: Path) -> None:
+        options: Dict[str, Any] = {"optimize": True}
+        if icc_profile:
+            options["icc_profile"] = icc_profile
+        if image_format == "JPEG":
+            options["quality"] = self.jpeg_quality
+            if image.mode not in ("RGB", "L", "CMYK"):
+                image = image.convert("RGB")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so other processes never read a partially written image
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=path.suffix)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format=image_format, **options)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _digest(self, path: str, file_key: Tuple[str, int, int]) -> str:
+        if file_key not in self._digests:
+            with open(path, "rb") as f:
+                self._digests[file_key] = hashlib.sha256(f.read()).hexdigest()
+        return self._digests[file_key]
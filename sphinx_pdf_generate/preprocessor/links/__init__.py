@@ -1 +1,6 @@
-from .util import rel_html_href, replace_asset_hrefs  # noqa: F401
+from .util import (  # noqa: F401
+    clear_link_cache,
+    link_cache_info,
+    rel_html_href,
+    replace_asset_hrefs,
+)
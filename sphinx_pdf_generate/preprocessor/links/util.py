@@ -1,10 +1,17 @@
 import os
 import re
+from functools import lru_cache
 from pathlib import Path
 
 from bs4 import BeautifulSoup
 from weasyprint import urls
 
+# Relative links, which should point to HTML pages that generate PDF documents
+RELATIVE_LINK_PATTERN = re.compile(r"^\.{,2}?[\w\-.~$&+,/:;=?@%#*]*?$")
+WEB_URL_PATTERN = re.compile(r"^(https://|http://|mailto:|tel:)")
+# Links rewritten per run. Pages in the same directory mostly link to the same pages, e.g. in their navigation.
+LINK_CACHE_SIZE = 8192
+
 
 # check if href is relative --
 # if it is relative it *should* be an HTML that generates a PDF doc
@@ -15,7 +22,7 @@ def is_doc(href: str):
     absurl = urls.url_is_absolute(href)
     abspath = os.path.isabs(href)
     htmlfile = ext.startswith(".html")
-    relative_link = re.search(r"^\.{,2}?[\w\-.~$&+,/:;=?@%#*]*?$", href)
+    relative_link = RELATIVE_LINK_PATTERN.search(href)
     if relative_link is not None:
         return True
     if absurl or abspath or not htmlfile:
@@ -24,19 +31,28 @@ def is_doc(href: str):
     return True
 
 
-def rel_html_href(base_url: str, href: str, site_url: str, outdir: str):
-    new_base_url = os.path.dirname(base_url)
-    rel_url = new_base_url.replace("file://", "")
+@lru_cache(maxsize=None)
+def _build_dir_pattern(outdir: str) -> re.Pattern:
     pattern = r"^(/tmp|tmp)/pages[\w\-]+|^[\w\-:\\]+\\+(temp|Temp)\\+pages[\w\-]+|^{}".format(outdir.rstrip("/"))
-    replace_build_dir = re.compile(pattern)
+    return re.compile(pattern)
+
+
+def rel_html_href(base_url: str, href: str, site_url: str, outdir: str):
+    if href.startswith("#"):
+        return href
+    return _rel_html_href(os.path.dirname(base_url), href, site_url, outdir)
 
-    internal = href.startswith("#")
-    web_url = re.search(r"^(https://|http://|mailto:|tel:)", href)
-    if web_url or internal or not is_doc(href):
+
+@lru_cache(maxsize=LINK_CACHE_SIZE)
+def _rel_html_href(page_dir: str, href: str, site_url: str, outdir: str) -> str:
+    rel_url = page_dir.replace("file://", "")
+
+    web_url = WEB_URL_PATTERN.search(href)
+    if web_url or not is_doc(href):
         return href
 
     abs_html_href = Path(rel_url).joinpath(href).resolve()
-    abs_html_href = replace_build_dir.sub(site_url.rstrip("/"), str(abs_html_href))
+    abs_html_href = _build_dir_pattern(outdir).sub(site_url.rstrip("/"), str(abs_html_href))
     abs_html_href = abs_html_href.replace("\\", "/")
 
     if abs_html_href:
@@ -44,6 +60,16 @@ def rel_html_href(base_url: str, href: str, site_url: str, outdir: str):
     return href
 
 
+def clear_link_cache() -> None:
+    """Forget the links rewritten so far, e.g. because the output directory may have changed since."""
+    _rel_html_href.cache_clear()
+
+
+def link_cache_info():
+    """Hits and misses of the cache of rewritten links, see :func:`functools.lru_cache`."""
+    return _rel_html_href.cache_info()
+
+
 def abs_asset_href(href: str, base_url: str):
     if urls.url_is_absolute(href) or Path(href).is_absolute():
         return href
@@ -1,6 +1,7 @@
 import re
+from typing import Optional
 
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 
 from .content import restructure_tabbed_content
 from .links import rel_html_href, replace_asset_hrefs
@@ -25,22 +26,34 @@ def get_separate(soup: BeautifulSoup, base_url: str, site_url: str, outdir: str)
     return soup
 
 
-def get_content(soup: BeautifulSoup) -> BeautifulSoup:
+def find_content(soup: BeautifulSoup) -> Optional[Tag]:
     """
-    Function to restructure HTML content by removing all unwanted parts and leaving only the content that will be
-    used in converting the PDF.
+    Function to find the element holding the main content of a page, without modifying the page.
 
     :param soup: HTML content
-    :return: Restructured HTML content
+    :return: The main content element, or None if the page has none
     """
     # support for sphinx-material & sphinx-immaterial theme
     content = soup.find("article", attrs={"class": "md-content__inner"})
     if content is None:
         # support for all sphinx themes
         content = soup.find(["div", "article"], attrs={"role": "main"})
-    new_content = [content]
-    soup.body.clear()
-    soup.body.extend(new_content)
+    return content
+
+
+def get_content(soup: BeautifulSoup) -> BeautifulSoup:
+    """
+    Function to restructure HTML content by removing all unwanted parts and leaving only the content that will be
+    used in converting the PDF.
+
+    :param soup: HTML content
+    :return: Restructured HTML content
+    """
+    content = find_content(soup)
+    # Destroy the rest of the page instead of detaching it, so the navigation and sidebars are freed right away
+    content.extract()
+    soup.body.clear(decompose=True)
+    soup.body.append(content)
     # Check image alignment
     all_images = soup.find_all("img", attrs={"align": re.compile(r"left|right")})
     for img in all_images:
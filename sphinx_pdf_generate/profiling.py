@@ -0,0 +1,39 @@
+"""Profiling of page conversions with cProfile, enabled with the ``pdfgen_profile`` option or ``--profile``."""
+
+import cProfile
+import pstats
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Union
+
+AGGREGATED_PROFILE_FILENAME = "_aggregated.prof"
+
+
+def get_profile_dir(outdir: Union[str, Path]) -> Path:
+    """Directory next to the ``pdf_html_debug`` folder where the profiles of page conversions are saved."""
+    return Path(outdir).parent.resolve().joinpath("pdf_profile")
+
+
+def get_profile_path(outdir: Union[str, Path], pagename: str) -> Path:
+    return get_profile_dir(outdir).joinpath(f"{pagename}.prof")
+
+
+def profile_call(path: Path, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Call ``func`` with cProfile and write the profile to ``path``, even if ``func`` raises an exception."""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+
+
+def aggregate_profiles(profile_files: Iterable[Path], path: Path) -> Optional[Path]:
+    """Combine the profiles of several page conversions into one profile written to ``path``.
+
+    :return: ``path``, or None if none of the profile files exist.
+    """
+    existing_files = [str(profile_file) for profile_file in profile_files if profile_file.is_file()]
+    if not existing_files:
+        return None
+    pstats.Stats(*existing_files).dump_stats(path)
+    return path
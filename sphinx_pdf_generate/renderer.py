@@ -1,21 +1,26 @@
+import html
 import logging
 import re
 import sys
 from importlib import import_module
 from importlib.util import module_from_spec, spec_from_file_location
 from pathlib import Path
-from typing import Any, Dict, Optional
+from timeit import default_timer as timer
+from typing import Any, Dict, Optional, Tuple, Union
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup
 from weasyprint import HTML
 
 from . import cover, toc
+from .image_cache import ImageCache
 from .options import Options
-from .preprocessor import get_content
+from .preprocessor import ImageTranscoder, clear_link_cache, get_content
 from .preprocessor import get_separate as prep_separate
-from .styles import style_for_print
+from .styles import PrintStylesheets, css_files_for_print, root_style_for_print
 from .templates.filters.url import URLFilter
 from .themes import generic as generic_theme
+from .timing import StageTimer
+from .utils import parse_html
 
 
 class Renderer:
@@ -25,34 +30,72 @@ class Renderer:
 
         self.theme = self._load_theme_handler()
         self.user_plugin = self._load_user_plugin_handler()
+        self.stylesheets = PrintStylesheets(options, self.theme.get_stylesheet())
+        # Links are rewritten relative to the output directory and site URL of this run
+        clear_link_cache()
+        disk_dir = options.cache_dir().joinpath("weasyprint") if options.image_cache_on_disk else None
+        self.image_cache = ImageCache(options.image_cache_size * 1024 * 1024, disk_dir)
+        self.image_transcoder = None
+        if options.image_dpi:
+            self.image_transcoder = ImageTranscoder(
+                options.cache_dir().joinpath("images"), options.image_dpi, options.jpeg_quality
+            )
         self.pgnum = 0
         self.pages = []
 
     def write_pdf(
         self,
-        content: str,
+        content: Union[str, BeautifulSoup],
         base_url: str,
-        filename: str,
+        filename: Optional[Union[str, Path]],
         pdf_metadata: Optional[Dict] = None,
+        stage_timer: Optional[StageTimer] = None,
+    ) -> Optional[bytes]:
+        """Render a page and write its PDF document to ``filename``, or return it if ``filename`` is None."""
+        stage_timer = StageTimer() if stage_timer is None else stage_timer
+        document = self.render_doc(content, base_url, pdf_metadata=pdf_metadata, stage_timer=stage_timer)
+        with stage_timer.stage("write_pdf"):
+            pdf_data = document.write_pdf(filename)
+        # The images of the document are no longer read from the cache once it is written
+        self.image_cache.trim()
+        return pdf_data
+
+    def render_doc(
+        self,
+        content: Union[str, BeautifulSoup],
+        base_url: str,
+        pdf_metadata: Dict = None,
+        stage_timer: Optional[StageTimer] = None,
     ):
-        self.render_doc(content, base_url, pdf_metadata=pdf_metadata).write_pdf(filename)
-
-    def render_doc(self, content: str, base_url: str, pdf_metadata: Dict = None):
-        soup = BeautifulSoup(content, "html5lib")
-        soup = get_content(soup)
+        """Lay out a page for print. A parsed page is restructured in place and destroyed once it is serialized for
+        WeasyPrint, so it must not be used afterwards.
+
+        :param stage_timer: Timer to add the time spent in each stage of the conversion to.
+        """
+        stage_timer = StageTimer() if stage_timer is None else stage_timer
+        if isinstance(content, str):
+            with stage_timer.stage("parse"):
+                soup = parse_html(content, self._options.html_parser)
+        else:
+            soup = content
+        with stage_timer.stage("get_content"):
+            soup = get_content(soup)
         self.inject_pgnum(soup)
 
-        style_tags: list[Tag] = style_for_print(self._options, pdf_metadata)
-        style_tags[0].append(self.theme.get_stylesheet())  # Add theme CSS
-
-        for style_tag in style_tags:
-            soup.head.append(style_tag)
-
-        soup = prep_separate(soup, base_url, self._options.site_url, self._config["outdir"])
-        toc.make_toc(soup, self._options)
-        cover.make_cover(soup, self._options, self._config, pdf_metadata=pdf_metadata)
+        soup.head.append(root_style_for_print(self._options, pdf_metadata))
+
+        with stage_timer.stage("get_separate"):
+            soup = prep_separate(soup, base_url, self._options.site_url, self._config["outdir"])
+        if self.image_transcoder is not None:
+            with stage_timer.stage("images"):
+                self.image_transcoder.transcode_images(soup)
+        with stage_timer.stage("toc"):
+            toc.make_toc(soup, self._options)
+        with stage_timer.stage("cover"):
+            cover.make_cover(soup, self._options, self._config, pdf_metadata=pdf_metadata)
         if self.user_plugin:
-            self.user_plugin.main(soup=soup)
+            with stage_timer.stage("user_plugin"):
+                self.user_plugin.main(soup=soup)
 
         # Enable Debugging
         not_as_uri = re.compile(r"^file:/{,2}")
@@ -71,10 +114,8 @@ class Renderer:
                 pdf_html_dir = Path(pdf_html_file).parent
                 if not pdf_html_dir.is_dir():
                     pdf_html_dir.mkdir(parents=True, exist_ok=True)
-                with open(pdf_html_file, "w", encoding="UTF-8") as f:
-                    f.write(soup.prettify())
-                html = HTML(string=str(soup)).render()
-                return html
+                self._write_debug_html(soup, pdf_html_file)
+                return self._render_html(soup, stage_timer)
         elif self._options.debug and self._options.debug_target is None:
             # Debug every PDF build file
             debug_folder_path = str(self._options.debug_dir()).replace("\\", "/")
@@ -83,11 +124,64 @@ class Renderer:
             pdf_html_dir = Path(pdf_html_file).parent
             if not pdf_html_dir.is_dir():
                 pdf_html_dir.mkdir(parents=True, exist_ok=True)
-            with open(pdf_html_file, "w", encoding="UTF-8") as f:
-                f.write(soup.prettify())
+            self._write_debug_html(soup, pdf_html_file)
+
+        return self._render_html(soup, stage_timer)
+
+    def _render_html(self, soup: BeautifulSoup, stage_timer: StageTimer):
+        with stage_timer.stage("layout"):
+            stylesheets = self.stylesheets.for_document(soup)
+            html_doc = HTML(string=str(soup))
+            # WeasyPrint has its own tree of the page, free the parsed page before laying it out
+            soup.decompose()
+            return html_doc.render(
+                stylesheets=stylesheets,
+                font_config=self.stylesheets.font_config,
+                counter_style=self.stylesheets.counter_style,
+                cache=self.image_cache,
+                optimize_images=self._options.optimize_images,
+                jpeg_quality=self._options.jpeg_quality,
+            )
 
-        html = HTML(string=str(soup)).render()
-        return html
+    def _write_debug_html(self, soup: BeautifulSoup, pdf_html_file: str) -> None:
+        # The plugin's stylesheets are passed to WeasyPrint separately, add them to the debug copy of the page
+        style_tags = []
+        for css_file in css_files_for_print(self._options):
+            style_tag = soup.new_tag(
+                "style", attrs={"class": "plugin-{}".format(css_file.name.lstrip("_").replace(".", "-"))}
+            )
+            style_tag.string = css_file.read_text(encoding="UTF-8")
+            if css_file.name == "_paging.css":
+                style_tag.string += self.theme.get_stylesheet() or ""
+            style_tags.append(style_tag)
+        for style_tag in style_tags:
+            soup.head.append(style_tag)
+        with open(pdf_html_file, "w", encoding="UTF-8") as f:
+            f.write(soup.prettify())
+        for style_tag in style_tags:
+            style_tag.decompose()
+
+    def warm_up(self) -> Tuple[float, float]:
+        """Lay out a small document with every font family used by the plugin's stylesheets.
+
+        This loads the fonts into the font configuration shared by every page before the first page is rendered.
+
+        :return: The time taken to lay out the document for the first time, and again once the fonts are loaded.
+        """
+        paragraphs = "".join(
+            '<p style="font-family: {}">Aa 1</p>'.format(html.escape(family))
+            for family in self.stylesheets.font_families()
+        )
+        timings = []
+        for _ in range(2):
+            start = timer()
+            HTML(string=f"<html><head></head><body>{paragraphs}</body></html>").render(
+                stylesheets=self.stylesheets.plugin_stylesheets(),
+                font_config=self.stylesheets.font_config,
+                counter_style=self.stylesheets.counter_style,
+            )
+            timings.append(timer() - start)
+        return timings[0], timings[1]
 
     def add_link(self, content: str, file_name: str = None):
         return self.theme.modify_html(content, file_name)
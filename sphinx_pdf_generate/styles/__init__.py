@@ -1,12 +1,20 @@
 import html
 import re
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
 
-from bs4 import Tag
+from bs4 import BeautifulSoup, Tag
+from weasyprint import CSS
+from weasyprint.css.counters import CounterStyle
+from weasyprint.text.fonts import FontConfiguration
+from weasyprint.urls import URLFetchingError
 
 from ..options import Options
 
+FONT_FAMILY_PATTERN = re.compile(r"font-family\s*:\s*([^;}!]+)")
+
 
 def _css_escape(text: Optional[str]) -> str:
     """@see https://developer.mozilla.org/en-US/docs/Web/CSS/string"""
@@ -22,8 +30,20 @@ def _css_escape(text: Optional[str]) -> str:
     return text.replace("'", "\\27")
 
 
-def style_for_print(options: Options, pdf_metadata: Optional[Dict[str, Any]] = None) -> list[Tag]:
-    base_path = Path(Path(__file__).parent).resolve()
+def get_custom_css_file(options: Options) -> Optional[Path]:
+    """Path of the ``pdf_custom.css`` file in the ``pdfgen_custom_css_path`` directory, if that directory exists."""
+    if options.custom_css_path is None:
+        return None
+    custom_css_path = Path(options.custom_css_path)
+    if not custom_css_path.is_absolute():
+        custom_css_path = Path(options.srcdir).resolve().joinpath(options.custom_css_path)
+    if not custom_css_path.is_dir():
+        return None
+    return custom_css_path.joinpath("pdf_custom.css")
+
+
+def root_style_for_print(options: Options, pdf_metadata: Optional[Dict[str, Any]] = None) -> Tag:
+    """Style tag with the CSS variables of a document, the only print style that changes from page to page."""
     pdf_metadata = {} if pdf_metadata is None else pdf_metadata
 
     css_string = """
@@ -53,38 +73,112 @@ def style_for_print(options: Options, pdf_metadata: Optional[Dict[str, Any]] = N
     )
     css_tag = Tag(name="style", attrs={"class": "plugin-default-css"})
     css_tag.append(css_string)
-    css_files = ["_paging.css"]
+    return css_tag
+
+
+def css_files_for_print(options: Options) -> List[Path]:
+    """The plugin's print stylesheets, followed by the custom CSS file."""
+    base_path = Path(Path(__file__).parent).resolve()
+    css_files = [base_path.joinpath("_paging.css")]
 
     if options.toc:
-        css_files.append("toc.css")
+        css_files.append(base_path.joinpath("toc.css"))
 
     if options.cover:
-        css_files.append("cover.css")
+        css_files.append(base_path.joinpath("cover.css"))
 
-    docs_src_dir = Path(options.srcdir).resolve()
-    custom_css_path = Path(options.custom_css_path) if options.custom_css_path is not None else Path()
+    custom_css_file = get_custom_css_file(options)
     # Add plugin custom CSS
-    if options.custom_css_path is not None:
-        if not custom_css_path.is_absolute():
-            custom_css_path = docs_src_dir.joinpath(options.custom_css_path)
-        if custom_css_path.is_dir():
-            css_files.append("pdf_custom.css")
-
-    css_styles_list: list[Tag] = []
-    for css_file in css_files:
-        filename = base_path.joinpath(css_file) if css_file != "pdf_custom.css" else custom_css_path.joinpath(css_file)
-        if filename.is_file():
-            with open(filename, encoding="UTF-8") as f:
-                css_rules = f.read()
-                if css_file in ["_styles.css", "_paging.css"]:
-                    css_tag.append(css_rules)
-                else:
-                    style_tag = Tag(
-                        name="style",
-                        attrs={"class": "plugin-{}".format(css_file.replace(".", "-"))},
-                    )
-                    style_tag.append(css_rules)
-                    css_styles_list.append(style_tag)
-
-    css_styles_list.insert(0, css_tag)  # Insert default CSS tag at the start
-    return css_styles_list
+    if custom_css_file is not None:
+        css_files.append(custom_css_file)
+
+    return [css_file for css_file in css_files if css_file.is_file()]
+
+
+def _mtime_ns(path: Union[str, Path]) -> Optional[int]:
+    try:
+        return Path(path).stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class PrintStylesheets:
+    """Print stylesheets parsed once per process into WeasyPrint ``CSS`` objects.
+
+    WeasyPrint gives stylesheets passed at render time a lower precedence than the stylesheets of the document. To keep
+    the plugin's stylesheets above the ones a page links to, the linked stylesheets are taken out of the page and
+    passed at render time too, in front of the plugin's stylesheets.
+
+    Stylesheet files are parsed again when they are modified.
+    """
+
+    def __init__(self, options: Options, theme_stylesheet: Optional[str]):
+        self._options = options
+        self._theme_stylesheet = theme_stylesheet
+        self.font_config = FontConfiguration()
+        self.counter_style = CounterStyle()
+        self._plugin_stylesheets: Dict[Path, Tuple[Optional[int], CSS]] = {}
+        self._theme_css: Optional[CSS] = None
+        self._linked_stylesheets: Dict[str, Tuple[Optional[int], Optional[CSS]]] = {}
+
+    def for_document(self, soup: BeautifulSoup) -> List[CSS]:
+        """Stylesheets to render ``soup`` with. The stylesheets linked by the page are removed from it."""
+        return self._pop_linked_stylesheets(soup) + self.plugin_stylesheets()
+
+    def plugin_stylesheets(self) -> List[CSS]:
+        stylesheets = []
+        for css_file in css_files_for_print(self._options):
+            stylesheets.append(self._file_stylesheet(css_file))
+            # Add theme CSS right after the paging CSS
+            if css_file.name == "_paging.css" and self._theme_stylesheet:
+                if self._theme_css is None:
+                    self._theme_css = self._parse(string=self._theme_stylesheet)
+                stylesheets.append(self._theme_css)
+        return stylesheets
+
+    def font_families(self) -> List[str]:
+        """The ``font-family`` values used by the plugin's stylesheets, in the order they first appear."""
+        css_texts = [css_file.read_text(encoding="UTF-8") for css_file in css_files_for_print(self._options)]
+        css_texts.append(self._theme_stylesheet or "")
+        families = (family.strip() for css in css_texts for family in FONT_FAMILY_PATTERN.findall(css))
+        return list(dict.fromkeys(family for family in families if family))
+
+    def _file_stylesheet(self, css_file: Path) -> CSS:
+        mtime_ns = _mtime_ns(css_file)
+        cached = self._plugin_stylesheets.get(css_file)
+        if cached is None or cached[0] != mtime_ns:
+            cached = (mtime_ns, self._parse(filename=str(css_file)))
+            self._plugin_stylesheets[css_file] = cached
+        return cached[1]
+
+    def _pop_linked_stylesheets(self, soup: BeautifulSoup) -> List[CSS]:
+        stylesheets = []
+        for link in soup.find_all("link", href=True):
+            # rel is a list of values, the other attributes are strings
+            rel = link.get_attribute_list("rel")
+            media = [media_type.strip().lower() for media_type in str(link.get("media") or "all").split(",")]
+            if "stylesheet" not in rel or "alternate" in rel or not {"all", "print"}.intersection(media):
+                continue
+            css = self._linked_stylesheet(str(link["href"]))
+            if css is not None:
+                stylesheets.append(css)
+                link.decompose()
+        return stylesheets
+
+    def _linked_stylesheet(self, href: str) -> Optional[CSS]:
+        url = urlsplit(href)
+        mtime_ns = _mtime_ns(url2pathname(url.path)) if url.scheme in ("file", "") else None
+        cached = self._linked_stylesheets.get(href)
+        if cached is None or cached[0] != mtime_ns:
+            try:
+                css = self._parse(guess=href)
+            except URLFetchingError as e:
+                # Leave the link in the page, so WeasyPrint reports the error as usual
+                self._options.logger.debug(f"Could not load stylesheet {href}: {e}")
+                css = None
+            cached = (mtime_ns, css)
+            self._linked_stylesheets[href] = cached
+        return cached[1]
+
+    def _parse(self, **source: str) -> CSS:
+        return CSS(**source, font_config=self.font_config, counter_style=self.counter_style)
@@ -1,9 +1,78 @@
+import os
 from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
 from . import _FilterBase
 
 
+class PathResolver:
+    """Finds files in the output directory, the source directory and the current directory, in that order.
+
+    The output and source directories are indexed once, so looking up a file in them does not touch the filesystem.
+    Paths outside of them are checked on the filesystem. Every lookup is cached.
+    """
+
+    def __init__(self, outdir: str, srcdir: str):
+        self.dirs: List[Path] = [Path(outdir).resolve(), Path(srcdir).resolve()]
+        self._indexes: Dict[Path, Set[str]] = {}
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def to_url(self, pathname: str) -> Optional[str]:
+        """The ``file://`` URL of the first file found for ``pathname``, or None if there is none."""
+        if pathname not in self._cache:
+            self._cache[pathname] = self._find(pathname)
+        return self._cache[pathname]
+
+    def _find(self, pathname: str) -> Optional[str]:
+        for directory in self.dirs + [Path(".").resolve()]:
+            candidate = os.path.normpath(os.path.join(directory, pathname))
+            if self._is_file(directory, candidate):
+                return Path(candidate).resolve().as_uri()
+        return None
+
+    def _is_file(self, directory: Path, candidate: str) -> bool:
+        if directory in self.dirs:
+            try:
+                relative = os.path.relpath(candidate, directory)
+            except ValueError:  # On another drive
+                relative = os.pardir
+            if relative.split(os.sep)[0] != os.pardir:
+                return relative in self._index(directory)
+        return os.path.isfile(candidate)
+
+    def _index(self, directory: Path) -> Set[str]:
+        if directory not in self._indexes:
+            files = set()
+            seen = set()
+            for root, dirnames, filenames in os.walk(directory, followlinks=True):
+                # Do not walk a directory twice through symbolic links
+                real_root = os.path.realpath(root)
+                if real_root in seen:
+                    dirnames[:] = []
+                    continue
+                seen.add(real_root)
+                relative_root = os.path.relpath(root, directory)
+                files.update(os.path.normpath(os.path.join(relative_root, filename)) for filename in filenames)
+            self._indexes[directory] = files
+        return self._indexes[directory]
+
+
+# Resolvers shared by every URLFilter of the process, by output and source directory
+_path_resolvers: Dict[Tuple[str, str], PathResolver] = {}
+
+
+def get_path_resolver(outdir: str, srcdir: str) -> PathResolver:
+    if (outdir, srcdir) not in _path_resolvers:
+        _path_resolvers[(outdir, srcdir)] = PathResolver(outdir, srcdir)
+    return _path_resolvers[(outdir, srcdir)]
+
+
+def clear_path_resolvers() -> None:
+    """Forget the files indexed so far, e.g. because a new build may have added or removed files."""
+    _path_resolvers.clear()
+
+
 class URLFilter(_FilterBase):
     """Finds a matching filename in some directories and returns its URL."""
 
@@ -16,20 +85,9 @@ class URLFilter(_FilterBase):
         if target_url.scheme or target_url.netloc:
             return pathname
 
-        # Search image file in below directories:
-        dirs = [
-            Path(self.config["outdir"]).resolve(),
-            Path(self.config["srcdir"]).resolve(),
-            Path("."),
-        ]
-
-        for d in dirs:
-            if not d:
-                continue
-            path = Path(Path.joinpath(d, pathname)).resolve()
-            if path.is_file():
-                return path.as_uri()
-        # return path
+        # Search image file in the output directory, the source directory and the current directory
+        resolver = get_path_resolver(self.config["outdir"], self.config["srcdir"])
+        url = resolver.to_url(pathname)
 
         # not found?
-        return pathname
+        return pathname if url is None else url
@@ -1,7 +1,7 @@
 # import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import jinja2
 
@@ -32,36 +32,55 @@ class Template:
 
         self._keywords = None
         self._jinja_env = None
+        self._cover_images = None
+
+    TEMPLATE_EXTENSIONS = [".html.j2", ".html.jinja2", ".html", ".htm"]
+
+    def search_paths(self) -> List[Path]:
+        """Directories searched for cover templates."""
+        base_path = Path(Path(__file__).parent).resolve()
+        template_paths = []
+        docs_src_dir = Path(self._options.srcdir).resolve()
+        # Include the template path specified under the `pdfgen_custom_template_path` configuration under conf.py
+        custom_template_path = Path(self._options.custom_template_path)
+        if not custom_template_path.is_absolute():
+            custom_template_path = docs_src_dir.joinpath(self._options.custom_template_path)
+        if custom_template_path.is_dir():
+            template_paths.append(custom_template_path)
+
+        # Include all templates path listed under the Sphinx `templates_path` configuration under conf.py
+        sphinx_templates_paths: List[str] = self._config["templates_path"]
+        for _templates_path in sphinx_templates_paths:
+            sphinx_template_path = Path(_templates_path)
+            if not sphinx_template_path.is_absolute():
+                sphinx_template_path = docs_src_dir.joinpath(sphinx_template_path)
+            if sphinx_template_path.is_dir():
+                template_paths.append(sphinx_template_path)
+
+        template_paths.append(base_path.joinpath("."))  # Include the extensions default templates folder path
+
+        return list(set(template_paths))
+
+    def template_files(self) -> List[Path]:
+        """Files in the template search paths that can be selected as cover templates."""
+        files = []
+        for template_path in self.search_paths():
+            for path in template_path.iterdir():
+                if path.is_file() and any(path.name.endswith(ext) for ext in self.TEMPLATE_EXTENSIONS):
+                    files.append(path)
+        return sorted(files)
 
     @property
     def _env(self) -> jinja2.Environment:
         def generate():
-            base_path = Path(Path(__file__).parent).resolve()
-            template_paths = []
-            docs_src_dir = Path(self._options.srcdir).resolve()
-            # Include the template path specified under the `pdfgen_custom_template_path` configuration under conf.py
-            custom_template_path = Path(self._options.custom_template_path)
-            if not custom_template_path.is_absolute():
-                custom_template_path = docs_src_dir.joinpath(self._options.custom_template_path)
-            if custom_template_path.is_dir():
-                template_paths.append(custom_template_path)
-
-            # Include all templates path listed under the Sphinx `templates_path` configuration under conf.py
-            sphinx_templates_paths: List[str] = self._config["templates_path"]
-            for _templates_path in sphinx_templates_paths:
-                sphinx_template_path = Path(_templates_path)
-                if not sphinx_template_path.is_absolute():
-                    sphinx_template_path = docs_src_dir.joinpath(sphinx_template_path)
-                if sphinx_template_path.is_dir():
-                    template_paths.append(sphinx_template_path)
-
-            template_paths.append(base_path.joinpath("."))  # Include the extensions default templates folder path
-
-            template_paths = list(set(template_paths))
-            file_loader = jinja2.FileSystemLoader(template_paths)
+            file_loader = jinja2.FileSystemLoader(self.search_paths())
             logging_undefined = jinja2.make_logging_undefined(logger=self._options.logger, base=jinja2.Undefined)
+            # Compiled templates are shared with the other processes converting pages and with later builds
+            bytecode_dir = self._options.cache_dir().joinpath("jinja2")
+            bytecode_dir.mkdir(exist_ok=True)
             env = jinja2.Environment(
                 loader=file_loader,
+                bytecode_cache=jinja2.FileSystemBytecodeCache(str(bytecode_dir)),
                 undefined=logging_undefined,
                 lstrip_blocks=True,
                 trim_blocks=True,
@@ -78,9 +97,23 @@ class Template:
             self._jinja_env = generate()
         return self._jinja_env
 
+    @property
+    def cover_images(self) -> Optional[Dict[str, str]]:
+        """URLs of the cover images by lowercase document type."""
+        if self._cover_images is None and self._options.cover_images is not None:
+            to_url = self._env.filters["to_url"]
+            self._cover_images = {
+                str(img_k).lower(): to_url(pathname=str(img_v)) for img_k, img_v in self._options.cover_images.items()
+            }
+        return self._cover_images
+
     @property
     def keywords(self) -> dict:
-        """Keywords to pass when rendering the template."""
+        """Keywords to pass when rendering the template.
+
+        The keywords are shared by every page, so they must not be modified. Put the keywords of a page in front of
+        them in a ``ChainMap`` instead.
+        """
 
         import html
 
@@ -139,7 +172,7 @@ class Template:
 
         real_names = []
         for name in names:
-            for ext in [".html.j2", ".html.jinja2", ".html", ".htm"]:
+            for ext in self.TEMPLATE_EXTENSIONS:
                 real_names.append(name + ext)
 
         return self._env.select_template(real_names, parent=parent, globals=globals)
@@ -1,23 +1,14 @@
 from typing import Optional
 
-from bs4 import BeautifulSoup
-
 
 def get_stylesheet() -> Optional[str]:
     return ""
 
 
 def modify_html(html: str, href: str) -> str:
-    soup = BeautifulSoup(html, "html5lib")
-
-    if soup.head:
-        link = soup.new_tag(
-            "link",
-            href=href,
-            rel="alternate",
-            title="PDF Export",
-            type="application/pdf",
-        )
-        soup.head.append(link)
+    link = f'<link href="{href}" rel="alternate" title="PDF Export" type="application/pdf"/>'
 
-    return str(soup)
+    # insert into HTML
+    insert_point = "</head>"
+    html = html.replace(insert_point, link + insert_point, 1)
+    return html
@@ -0,0 +1,57 @@
+"""Timing of the stages a page goes through while it is converted to PDF."""
+
+import json
+from contextlib import contextmanager
+from pathlib import Path
+from timeit import default_timer as timer
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+TIMING_REPORT_FILENAME = "pdf_timings.json"
+
+
+class StageTimer:
+    """Seconds spent in each stage of a page conversion, in the order the stages were first entered."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = timer()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0) + timer() - start
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+
+def write_timing_report(outdir: Union[str, Path], page_timings: Dict[str, Dict[str, Any]]) -> Path:
+    """Write the time spent in each stage of every page, and in each stage over all pages, to a JSON file."""
+    stages: Dict[str, float] = {}
+    for page_timing in page_timings.values():
+        for stage, seconds in page_timing["stages"].items():
+            stages[stage] = stages.get(stage, 0) + seconds
+    report = {
+        "total": sum(page_timing.get("total", 0) for page_timing in page_timings.values()),
+        "stages": stages,
+        "pages": page_timings,
+    }
+    path = Path(outdir).joinpath(TIMING_REPORT_FILENAME)
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(report, json_file, indent=4, sort_keys=True)
+    return path
+
+
+def slowest_pages(page_timings: Dict[str, Dict[str, Any]], count: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """The ``count`` pages that took the longest to convert, slowest first."""
+    ranking = sorted(page_timings.items(), key=lambda item: item[1].get("total", 0), reverse=True)
+    return ranking[:count]
+
+
+def format_stages(stages: Dict[str, float], limit: Optional[int] = None) -> str:
+    """The ``limit`` slowest stages of a page conversion, slowest first, e.g. ``layout 1.20s, parse 0.31s``."""
+    ranking = sorted(stages.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in ranking)
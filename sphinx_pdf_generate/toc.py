@@ -1,7 +1,12 @@
-from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+import logging
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
 
 from .options import Options
 
+HEADINGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+
 
 def make_toc(soup: BeautifulSoup, options: Options):
     """Generate a toc tree.
@@ -18,27 +23,23 @@ def make_toc(soup: BeautifulSoup, options: Options):
 def _make_indexes(soup: BeautifulSoup, options: Options) -> None:
     """Generate ordered chapter number and TOC of document.
 
+    The headings are numbered and added to the TOC in a single pass over the document.
+
     Arguments:
         soup {BeautifulSoup} -- HTML content.
         options {Options} -- The options of this sequence.
     """
 
-    # Step 1: (re)ordered headings
-    if options.toc_ordering:
-        _inject_heading_order(soup, options)
-
-    # Step 2: generate toc page
     level = options.toc_level
     if level < 1 or level > 6:
         return
 
     options.logger.info(f"Generate table of contents up to heading level {level} for PDF document.")
+    if options.toc_ordering:
+        options.logger.debug(f"Number headings up to level {level}.")
+    log_links = options.logger.isEnabledFor(logging.DEBUG)
 
-    h1li = None
-    h2ul = h2li = h3ul = h3li = h4ul = h4li = h5ul = h5li = h6ul = None
-    # exclude_lv2 = exclude_lv3 = False
-
-    def makelink(heading: PageElement) -> PageElement:
+    def makelink(heading: Tag) -> Tag:
         li = soup.new_tag("li")
         ref = heading.get("id", "")
         if ref == "":
@@ -49,13 +50,11 @@ def _make_indexes(soup: BeautifulSoup, options: Options) -> None:
             if prefix is not None
             else soup.new_tag("a", href=f"#{ref}")
         )
-        for el in heading.contents:
-            if el.name == "a":
-                a.append(el.contents[0].replace("¶", ""))
-            else:
-                a.append(_clone_element(el))
+        text = _heading_text(heading)
+        a.append(soup.new_string(text))
         li.append(a)
-        options.logger.debug(f"| [{heading.get_text(separator=' ')}]({ref})")
+        if log_links:
+            options.logger.debug(f"| [{text}]({ref})")
         return li
 
     toc = soup.new_tag("article", id="doc-toc")
@@ -66,131 +65,48 @@ def _make_indexes(soup: BeautifulSoup, options: Options) -> None:
     h1ul = soup.new_tag("ul")
     toc.append(h1ul)
 
-    headings = soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6"])
-    for h in headings:
-        if h.name == "h1":
-            h1li = makelink(h)
-            h1ul.append(h1li)
-            h2ul = h2li = h3ul = h3li = h4ul = h4li = h5ul = h5li = h6ul = None
-
-            # exclude_lv2 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h2" and level >= 2:
-            if not h2ul:
-                h2ul = soup.new_tag("ul")
-                h1li.append(h2ul)
-            h2li = makelink(h)
-            h2ul.append(h2li)
-            h3ul = h3li = h4ul = h4li = h5ul = h5li = h6ul = None
-
-            # exclude_lv3 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h3" and level >= 3:
-            if not h2li:
-                continue
-            if not h3ul:
-                h3ul = soup.new_tag("ul")
-                h2li.append(h3ul)
-            h3li = makelink(h)
-            h3ul.append(h3li)
-            h4ul = h4li = h5ul = h5li = h6ul = None
-
-        elif h.name == "h4" and level >= 4:
-            if not h3li:
-                continue
-            if not h4ul:
-                h4ul = soup.new_tag("ul")
-                h3li.append(h4ul)
-            h4li = makelink(h)
-            h4ul.append(h4li)
-            h5ul = h5li = h6ul = None
-
-        elif h.name == "h5" and level >= 5:
-            if not h4li:
-                continue
-            if not h5ul:
-                h5ul = soup.new_tag("ul")
-                h4li.append(h5ul)
-            h5li = makelink(h)
-            h5ul.append(h5li)
-            h6ul = None
-
-        elif h.name == "h6" and level >= 6:
-            if not h5li:
-                continue
-            if not h6ul:
-                h6ul = soup.new_tag("ul")
-                h5li.append(h6ul)
-            h6li = makelink(h)
-            h6ul.append(h6li)
+    # Index 0 stands for the level above h1. For each heading level: its number, the list holding the TOC entries
+    # of its headings and the TOC entry of the last of them.
+    numbers = [0] * 7
+    lists: List[Optional[Tag]] = [None, h1ul] + [None] * 5
+    items: List[Optional[Tag]] = [None] * 7
 
-        else:
+    for h in soup.find_all(HEADINGS):
+        n = int(h.name[1])
+        if n > level:
             continue
+        deeper = n + 1
 
-    soup.body.insert(0, toc)
-
-
-def _inject_heading_order(soup: BeautifulSoup, options: Options):
-    level = options.toc_level
-    if level < 1 or level > 6:
-        return
-
-    options.logger.debug(f"Number headings up to level {level}.")
+        if options.toc_ordering:
+            numbers[n] += 1
+            numbers[deeper:] = [0] * (6 - n)
+            h["data-numbering"] = ".".join(str(number) for number in numbers[1:deeper]) + ". "
 
-    h1n = h2n = h3n = h4n = h5n = h6n = 0
-    # exclude_lv2 = exclude_lv3 = False
-
-    headings = soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6"])
-    for h in headings:
-        if h.name == "h1":
-            h1n += 1
-            h2n = h3n = h4n = h5n = h6n = 0
-            prefix = f"{h1n}. "
-
-        # exclude_lv2 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h2" and level >= 2:
-            h2n += 1
-            h3n = h4n = h5n = h6n = 0
-            prefix = f"{h1n}.{h2n}. "
-
-            # exclude_lv3 = _is_exclude(h.get("id", None), options)
-
-        elif h.name == "h3" and level >= 3:
-            h3n += 1
-            h4n = h5n = h6n = 0
-            prefix = f"{h1n}.{h2n}.{h3n}. "
-
-        elif h.name == "h4" and level >= 4:
-            h4n += 1
-            h5n = h6n = 0
-            prefix = f"{h1n}.{h2n}.{h3n}.{h4n}. "
-
-        elif h.name == "h5" and level >= 5:
-            h5n += 1
-            h6n = 0
-            prefix = f"{h1n}.{h2n}.{h3n}.{h4n}.{h5n}. "
-
-        elif h.name == "h6" and level >= 6:
-            h6n += 1
-            prefix = f"{h1n}.{h2n}.{h3n}.{h4n}.{h5n}.{h6n}. "
-
-        else:
+        if n > 1 and items[n - 1] is None:
+            # No parent entry to nest the entry of this heading in
             continue
+        if lists[n] is None:
+            lists[n] = soup.new_tag("ul")
+            items[n - 1].append(lists[n])
+        items[n] = makelink(h)
+        lists[n].append(items[n])
+        lists[deeper:] = [None] * (6 - n)
+        items[deeper:] = [None] * (6 - n)
 
-        h["data-numbering"] = prefix
-
+    soup.body.insert(0, toc)
 
-def _clone_element(el: Tag) -> Tag:
-    if isinstance(el, NavigableString):
-        return type(el)(el)
 
-    copy = Tag(None, el.builder, el.name, el.namespace, el.nsprefix)
-    # work around bug where there is no builder set
-    # https://bugs.launchpad.net/beautifulsoup/+bug/1307471
-    copy.attrs = dict(el.attrs)
-    for attr in ("can_be_empty_element", "hidden"):
-        setattr(copy, attr, getattr(el, attr))
-    for child in el.contents:
-        copy.append(_clone_element(child))
-    return copy
+def _heading_text(heading: Tag) -> str:
+    """Text of a heading, without the permalink sign Sphinx adds to it."""
+    text = []
+    for child in heading.contents:
+        # NavigableString.get_text() only exists in beautifulsoup4 >= 4.10
+        if isinstance(child, Comment):
+            continue
+        if isinstance(child, NavigableString):
+            text.append(str(child))
+        elif child.name == "a":
+            text.append(child.get_text().replace("¶", ""))
+        else:
+            text.append(child.get_text())
+    return "".join(text)
@@ -1,8 +1,11 @@
 import os
 import re
-from typing import Any, Dict, List, Optional, Tuple, Union
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
-from bs4 import BeautifulSoup, PageElement
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, PageElement
 
 PDF_LOCAL_OPTIONS: List[Tuple[str, Union[bool, str, None]]] = [
     ("pdf-build", True),
@@ -48,7 +51,7 @@ def get_pdf_metadata(pdf_metadata: Optional[Dict[str, Any]] = None) -> Dict[str,
     return pdf_meta
 
 
-def secure_filename(filename):
+def secure_filename(filename: str) -> str:
     r"""Pass it a filename, and it will return a secure version of it.  This
     filename can then safely be stored on a regular file system and passed
     to :func:`os.path.join`.  The filename returned is an ASCII only string
@@ -99,10 +102,35 @@ def secure_filename(filename):
     return filename
 
 
-def h1_title_tag(content: Union[str, PageElement], pdf_title: str) -> Optional[str]:
+# HTML parsers supported by BeautifulSoup, fastest first.
+HTML_PARSERS: List[str] = ["lxml", "html.parser", "html5lib"]
+
+
+def is_html_parser_installed(parser: str) -> bool:
+    return parser == "html.parser" or (parser in HTML_PARSERS and find_spec(parser) is not None)
+
+
+@lru_cache(maxsize=None)
+def default_html_parser() -> str:
+    """The fastest HTML parser that is installed."""
+    return next(parser for parser in HTML_PARSERS if is_html_parser_installed(parser))
+
+
+def parse_html(content: str, parser: Optional[str] = None) -> "BeautifulSoup":
+    """Parse an HTML page into a BeautifulSoup tree.
+
+    :param content: HTML content
+    :param parser: One of the ``HTML_PARSERS``. Defaults to the fastest one installed.
+    """
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(content, parser or default_html_parser())
+
+
+def h1_title_tag(content: Union[str, "PageElement"], pdf_title: str, parser: Optional[str] = None) -> Optional[str]:
     soup = content
     if isinstance(soup, str):
-        soup = BeautifulSoup(soup, "html5lib")
+        soup = parse_html(soup, parser)
     title = soup.find("h1", attrs={"id": re.compile(r"[\w\-]+")})
     if title is None:
         return pdf_title
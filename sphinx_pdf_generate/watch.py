@@ -0,0 +1,99 @@
+"""Watch the files of a project, so that it is built again and its pages converted again when they change."""
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Seconds between two scans of the watched files
+POLL_INTERVAL = 1.0
+# Files written by editors and tools, which do not change the documentation
+IGNORED_SUFFIXES = ("~", ".swp", ".swx", ".tmp", ".pyc")
+IGNORED_DIRNAMES = ("__pycache__",)
+
+
+def watched_paths(srcdir: str, confdir: Optional[str], global_config: Dict[str, Any]) -> List[Path]:
+    """The source and configuration directories, and the templates, CSS and handlers the PDF files are rendered with.
+
+    Most of them are inside the source directory, they are only watched separately when they are not.
+    """
+    srcdir_path = Path(srcdir).resolve()
+    paths = [srcdir_path]
+    if confdir is not None:
+        paths.append(Path(confdir).resolve())
+    # Relative to the source directory, like in Template.search_paths and get_custom_css_file
+    for option in ("custom_template_path", "custom_css_path"):
+        if global_config.get(option):
+            paths.append(srcdir_path.joinpath(global_config[option]))
+    for templates_path in global_config.get("templates_path") or []:
+        paths.append(srcdir_path.joinpath(templates_path))
+    # Relative to the current directory, like in Renderer._load_theme_handler
+    for option in ("theme_handler_path", "plugin_handler_path"):
+        if global_config.get(option):
+            paths.append(Path.cwd().joinpath(global_config[option]))
+    return paths
+
+
+class FileWatcher:
+    """Polls files and the files of directories for changes to their modification time or size.
+
+    Polling needs no dependency and works on network and container filesystems, where file system events are often
+    not delivered.
+
+    :param paths: Files and directories to watch. The directories are watched recursively.
+    :param ignored: Directories not to watch, e.g. the output directory when it is inside the source directory.
+    """
+
+    def __init__(self, paths: Iterable[Path], ignored: Iterable[Path] = ()):
+        resolved = {Path(path).resolve() for path in paths}
+        # Directories inside another watched directory are already scanned with it
+        self.paths = sorted(path for path in resolved if not resolved.intersection(path.parents))
+        self.ignored = {os.path.realpath(path) for path in ignored}
+        self._files = self._scan()
+
+    def changes(self) -> List[Path]:
+        """Files added, removed or modified since the last scan."""
+        files = self._scan()
+        changed = {path for path in files.keys() | self._files.keys() if files.get(path) != self._files.get(path)}
+        self._files = files
+        return sorted(Path(path) for path in changed)
+
+    def wait(self, interval: float = POLL_INTERVAL) -> List[Path]:
+        """Wait until files change, then until they stop changing, e.g. while an editor saves several files."""
+        changed: Set[Path] = set()
+        while not changed:
+            time.sleep(interval)
+            changed.update(self.changes())
+        while True:
+            time.sleep(interval)
+            more = self.changes()
+            if not more:
+                return sorted(changed)
+            changed.update(more)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        files: Dict[str, Tuple[int, int]] = {}
+        for path in self.paths:
+            if path.is_file():
+                self._stat(str(path), files)
+                continue
+            for root, dirnames, filenames in os.walk(path):
+                dirnames[:] = [
+                    dirname
+                    for dirname in dirnames
+                    if not dirname.startswith(".")
+                    and dirname not in IGNORED_DIRNAMES
+                    and os.path.realpath(os.path.join(root, dirname)) not in self.ignored
+                ]
+                for filename in filenames:
+                    if not filename.startswith(".") and not filename.endswith(IGNORED_SUFFIXES):
+                        self._stat(os.path.join(root, filename), files)
+        return files
+
+    @staticmethod
+    def _stat(path: str, files: Dict[str, Tuple[int, int]]) -> None:
+        try:
+            stat = os.stat(path)
+        except OSError:  # Removed while scanning
+            return
+        files[path] = (stat.st_mtime_ns, stat.st_size)
@@ -0,0 +1,178 @@
+"""Convert Sphinx HTML pages to PDF, either in the current process or spread across a process pool."""
+
+import gc
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Optional
+
+from .build import show
+from .pdf_generate import PdfGeneratePlugin
+
+resource: Optional[ModuleType]
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Plugin instance owned by a worker process. Each worker builds its own ``Renderer`` in ``on_config``.
+_worker_plugin: Optional[PdfGeneratePlugin] = None
+# Whether a worker process collects garbage after each page, to keep its memory usage flat
+_collect_garbage = False
+# Pages handed to the pool per worker process. Keeping a page queued for each worker avoids idle workers, while
+# keeping few pages queued lets the workers be replaced soon after one of them reached its limits.
+PAGES_IN_FLIGHT_PER_WORKER = 2
+
+
+def available_jobs() -> int:
+    """Number of worker processes used for ``--jobs auto``."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def convert_page(
+    pdf_generator: PdfGeneratePlugin,
+    outdir: str,
+    pagename: str,
+    page_metadata: Dict[str, str],
+    html_content: Optional[str] = None,
+) -> None:
+    """Convert one HTML page to PDF and write back the HTML page with the PDF download link.
+
+    :param html_content: Content of the HTML page, if it is already in memory. Otherwise, it is read from ``outdir``.
+    """
+    html_page_path = Path(outdir).joinpath(f"{pagename}.html")
+    if html_content is None:
+        html_content = html_page_path.read_text(encoding="utf-8")
+    new_html_page_content = pdf_generator.convert_page_to_pdf(
+        html_content=html_content, pagename=pagename, page_metadata=page_metadata
+    )
+    if new_html_page_content != html_content:
+        html_page_path.write_text(data=new_html_page_content, encoding="utf-8")
+
+
+def try_convert_page(
+    pdf_generator: PdfGeneratePlugin,
+    outdir: str,
+    pagename: str,
+    page_metadata: Dict[str, str],
+    html_content: Optional[str] = None,
+) -> None:
+    """Convert one page like :func:`convert_page`, showing and counting an error instead of raising it.
+
+    Every way of converting pages goes on with the next page after an error, so that the manifest is saved with the
+    pages converted so far and the failed pages are converted again by the next build.
+    """
+    try:
+        convert_page(pdf_generator, outdir, pagename, page_metadata, html_content)
+    except Exception as e:
+        show(context=str(pdf_generator.page_error(pagename, e)), error=True)
+
+
+def peak_rss() -> Optional[float]:
+    """Peak resident set size of the current process in megabytes, or None if the platform does not report it."""
+    if resource is None:
+        return None
+    max_rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def _init_worker(global_config: Dict[str, Any], collect_garbage: bool = False) -> None:
+    global _worker_plugin, _collect_garbage
+    _worker_plugin = PdfGeneratePlugin()
+    _worker_plugin.on_config(global_config)
+    _collect_garbage = collect_garbage
+
+
+def _convert_in_worker(pagename: str, page_metadata: Dict[str, str], html_content: Optional[str]) -> Dict[str, Any]:
+    """Convert a page in a worker process.
+
+    :return: The counters the conversion added to the worker's plugin, the page's manifest entry, the time spent in
+        each stage of the conversion, and the process ID and peak memory usage of the worker.
+    """
+    pdf_generator = _worker_plugin
+    assert pdf_generator is not None and pdf_generator.manifest is not None, "_init_worker sets up the plugin"
+    before = pdf_generator.stats()
+    try_convert_page(pdf_generator, pdf_generator.config["outdir"], pagename, page_metadata, html_content)
+    if _collect_garbage:
+        # The parsed pages and laid out documents are full of reference cycles, free them before the next page
+        gc.collect()
+    after = pdf_generator.stats()
+    return {
+        "stats": {name: value - before.get(name, 0) for name, value in after.items()},
+        "manifest_entry": pdf_generator.manifest.entries.get(pagename),
+        "page_timing": pdf_generator.page_timings.pop(pagename, None),
+        "pid": os.getpid(),
+        "peak_rss": peak_rss(),
+    }
+
+
+def convert_pages_in_pool(
+    pdf_generator: PdfGeneratePlugin,
+    global_config: Dict[str, Any],
+    pages: Dict[str, Dict[str, Any]],
+    jobs: int,
+    html_pages: Optional[Dict[str, str]] = None,
+    max_pages_per_worker: Optional[int] = None,
+    max_rss: Optional[float] = None,
+) -> None:
+    """Convert ``pages`` with ``jobs`` worker processes and add their counters to ``pdf_generator``.
+
+    Only a few pages per worker are handed to the pool at a time. Once a worker has converted
+    ``max_pages_per_worker`` pages or its memory usage reached ``max_rss``, no more pages are handed to the pool: the
+    pages being converted are finished, then the worker processes are replaced by new ones for the remaining pages.
+
+    :param pdf_generator: Plugin instance collecting the counters, manifest entries and page timings of all workers.
+    :param global_config: Global options each worker uses to set up its own plugin and renderer.
+    :param pages: Mapping of page names to their page metadata.
+    :param jobs: Number of worker processes.
+    :param html_pages: Mapping of page names to HTML content already in memory. Pages missing from it are read from
+        the output directory by the workers.
+    :param max_pages_per_worker: Number of pages a worker converts before the workers are replaced.
+    :param max_rss: Peak memory usage of a worker in megabytes before the workers are replaced.
+    """
+    html_pages = {} if html_pages is None else html_pages
+    if max_rss is not None and resource is None:
+        show(context="The memory usage of worker processes cannot be measured on this platform", error=True)
+        max_rss = None
+    pending = list(reversed(pages.items()))
+    bounded = max_pages_per_worker is not None or max_rss is not None
+    in_flight = jobs * min(PAGES_IN_FLIGHT_PER_WORKER, max_pages_per_worker or PAGES_IN_FLIGHT_PER_WORKER)
+    while pending:
+        pages_per_worker: Dict[int, int] = {}
+        recycle = False
+        initargs = (global_config, bounded)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as executor:
+            futures: Dict[Future[Dict[str, Any]], str] = {}
+            while futures or (pending and not recycle):
+                while pending and not recycle and len(futures) < in_flight:
+                    pagename, page_metadata = pending.pop()
+                    future = executor.submit(
+                        _convert_in_worker, pagename, page_metadata, html_pages.pop(pagename, None)
+                    )
+                    futures[future] = pagename
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pagename = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # The worker died or the page could not be handed over, e.g. a worker killed for lack of
+                        # memory breaks the pool: go on with the remaining pages in new worker processes
+                        show(context=str(pdf_generator.page_error(pagename, e)), error=True)
+                        recycle = True
+                        continue
+                    pdf_generator.merge_page_result(pagename, result)
+                    if result["peak_rss"] is not None:
+                        pdf_generator.peak_worker_rss = max(pdf_generator.peak_worker_rss, result["peak_rss"])
+                    pages_per_worker[result["pid"]] = pages_per_worker.get(result["pid"], 0) + 1
+                    if max_pages_per_worker is not None and pages_per_worker[result["pid"]] >= max_pages_per_worker:
+                        recycle = True
+                    if max_rss is not None and result["peak_rss"] is not None and result["peak_rss"] >= max_rss:
+                        recycle = True
+        if pending:
+            pdf_generator.worker_recycles += 1
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The tests build the synthetic projects of the benchmark suite
+sys.path.insert(0, str(Path(__file__).resolve().parents[1].joinpath("benchmarks")))
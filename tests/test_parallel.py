@@ -0,0 +1,74 @@
+"""The pages recorded by the Sphinx extension when Sphinx reads and writes a project with ``sphinx-build -j``."""
+
+import dataclasses
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pytest
+from projects import SCENARIOS, write_project
+from sphinx.application import Sphinx
+
+PAGES = 40
+JOBS = 8
+
+
+def _build(srcdir: Path, outdir: Path) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Build the project in parallel.
+
+    :return: The page metadata kept in the environment by the extension, and the ``pdf_metadata.json`` file.
+    """
+    app = Sphinx(srcdir, srcdir, outdir, outdir.joinpath(".doctrees"), "html", status=None, parallel=JOBS)
+    app.build()
+    assert app.statuscode == 0, f"Sphinx could not build the project in {srcdir}"
+    with open(outdir.joinpath("pdf_metadata.json"), encoding="utf-8") as json_file:
+        return app.env.sphinx_pdfgen_data, json.load(json_file)
+
+
+def _revisions(page_data: Dict[str, Any]) -> Dict[str, str]:
+    return {pagename: metadata.get("pdf-revision") for pagename, metadata in page_data.items() if pagename != "index"}
+
+
+@pytest.fixture
+def srcdir(tmp_path: Path) -> Path:
+    srcdir = tmp_path.joinpath("source")
+    write_project(dataclasses.replace(SCENARIOS["pages-10"], pages=PAGES), srcdir, "alabaster")
+    return srcdir
+
+
+@pytest.fixture
+def pagenames(srcdir: Path) -> List[str]:
+    return sorted(path.stem for path in srcdir.glob("*.rst"))
+
+
+def test_parallel_build_merges_every_page(srcdir: Path, pagenames: List[str], tmp_path: Path) -> None:
+    page_data, pdf_metadata = _build(srcdir, tmp_path.joinpath("html"))
+
+    assert sorted(page_data) == pagenames
+    assert set(_revisions(page_data).values()) == {"1.0"}
+    assert sorted(pdf_metadata["LOCAL_OPTIONS"]) == pagenames
+    assert set(pagenames) <= set(pdf_metadata["UPDATED_PAGES"])
+
+
+def test_parallel_rebuild_purges_removed_pages_and_merges_changed_pages(
+    srcdir: Path, pagenames: List[str], tmp_path: Path
+) -> None:
+    outdir = tmp_path.joinpath("html")
+    _build(srcdir, outdir)
+    removed = set(pagenames[1::10]) - {"index"}
+    for pagename in removed:
+        srcdir.joinpath(f"{pagename}.rst").unlink()
+    changed = set(pagenames[::7]) - removed - {"index"}
+    for pagename in changed:
+        path = srcdir.joinpath(f"{pagename}.rst")
+        path.write_text(path.read_text(encoding="utf-8").replace(":pdf-revision: 1.0", ":pdf-revision: 2.0"))
+
+    page_data, pdf_metadata = _build(srcdir, outdir)
+
+    pages = set(pagenames) - removed
+    assert set(page_data) == pages
+    assert _revisions(page_data) == {
+        pagename: "2.0" if pagename in changed else "1.0" for pagename in pages - {"index"}
+    }
+    assert set(pdf_metadata["LOCAL_OPTIONS"]) == pages
+    assert changed <= set(pdf_metadata["UPDATED_PAGES"])